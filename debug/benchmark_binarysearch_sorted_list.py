@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+
+"""
+Compare ``fixa.binarysearch.SortedList.add`` with ``bisect.insort`` on a
+flat list for random inserts.
+"""
+
+import time
+import random
+import bisect
+
+from fixa.binarysearch import SortedList
+
+random.seed(1)
+
+for n in [10_000, 100_000, 1_000_000]:
+    values = [random.random() for _ in range(n)]
+
+    st = time.perf_counter()
+    lst = list()
+    for value in values:
+        bisect.insort(lst, value)
+    elapsed_insort = time.perf_counter() - st
+
+    st = time.perf_counter()
+    sl = SortedList()
+    for value in values:
+        sl.add(value)
+    elapsed_sorted_list = time.perf_counter() - st
+
+    assert list(sl) == lst
+    print(
+        f"n = {n:>10}, bisect.insort: {elapsed_insort:.4f} sec, "
+        f"SortedList.add: {elapsed_sorted_list:.4f} sec"
+    )
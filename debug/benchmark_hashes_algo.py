@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+
+"""
+Compare the throughput of the hash algorithms in ``fixa.hashes.HashAlgoEnum``
+on an in-memory buffer and on a file. The xxhash algorithms are skipped if
+the xxhash package is not installed.
+"""
+
+import time
+import tempfile
+from pathlib import Path
+
+from fixa.hashes import hashes, HashAlgoEnum
+
+SIZE = 256 * 1024 * 1024  # 256 MB
+REPEAT = 3
+
+
+def best_of(func, *args) -> float:
+    elapsed = list()
+    for _ in range(REPEAT):
+        st = time.perf_counter()
+        func(*args)
+        elapsed.append(time.perf_counter() - st)
+    return min(elapsed)
+
+
+def main():
+    data = bytes(range(256)) * (SIZE // 256)
+    with tempfile.TemporaryDirectory() as dir:
+        path = Path(dir) / "data.bin"
+        path.write_bytes(data)
+        print(f"{'algo':<10} {'bytes MB/s':>12} {'file MB/s':>12}")
+        for algo in HashAlgoEnum:
+            try:
+                hashes.of_bytes(b"", algo=algo)
+            except ImportError:
+                print(f"{algo.value:<10} {'n/a':>12} {'n/a':>12}")
+                continue
+            mb = SIZE / 1024 / 1024
+            t1 = best_of(hashes.of_bytes, data, algo)
+            t2 = best_of(hashes.of_file, path, 0, 1024 * 1024, algo)
+            print(f"{algo.value:<10} {mb / t1:>12.0f} {mb / t2:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
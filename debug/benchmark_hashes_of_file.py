@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+
+"""
+Compare the strategies to hash a large file, it is used to pick the default
+chunk size and method of ``fixa.hashes.Hashes.of_file``.
+"""
+
+import os
+import sys
+import mmap
+import time
+import hashlib
+import tempfile
+from pathlib import Path
+
+from fixa.hashes import hashes
+
+FILE_SIZE = 1024 * 1024 * 1024  # 1 GB
+ALGO = "sha256"
+
+
+def read_bytes(path: Path, chunk_size: int) -> str:
+    m = hashlib.new(ALGO)
+    with path.open("rb") as f:
+        while True:
+            data = f.read(chunk_size)
+            if not data:
+                break
+            m.update(data)
+    return m.hexdigest()
+
+
+def read_into(path: Path, chunk_size: int) -> str:
+    m = hashlib.new(ALGO)
+    buffer = bytearray(chunk_size)
+    view = memoryview(buffer)
+    with path.open("rb", buffering=0) as f:
+        while True:
+            n = f.readinto(buffer)
+            if not n:
+                break
+            m.update(view[:n])
+    return m.hexdigest()
+
+
+def use_mmap(path: Path) -> str:
+    m = hashlib.new(ALGO)
+    with path.open("rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            m.update(mm)
+    return m.hexdigest()
+
+
+def use_file_digest(path: Path) -> str:
+    with path.open("rb") as f:
+        return hashlib.file_digest(f, ALGO).hexdigest()
+
+
+def timeit(name: str, func, *args):
+    st = time.perf_counter()
+    digest = func(*args)
+    elapsed = time.perf_counter() - st
+    print(f"{name:<32}: {elapsed:.4f} sec, {FILE_SIZE / elapsed / 1024 ** 2:.0f} MB/s")
+    return digest
+
+
+path = Path(tempfile.mkdtemp()) / "large.bin"
+try:
+    with path.open("wb") as f:
+        for _ in range(FILE_SIZE // (64 * 1024 * 1024)):
+            f.write(os.urandom(64 * 1024 * 1024))
+
+    digests = set()
+    for chunk_size in [1024, 4096, 64 * 1024, 1024 * 1024, 8 * 1024 * 1024]:
+        digests.add(timeit(f"read, chunk = {chunk_size}", read_bytes, path, chunk_size))
+    for chunk_size in [64 * 1024, 1024 * 1024, 8 * 1024 * 1024]:
+        digests.add(timeit(f"readinto, chunk = {chunk_size}", read_into, path, chunk_size))
+    digests.add(timeit("mmap", use_mmap, path))
+    if sys.version_info >= (3, 11):
+        digests.add(timeit("hashlib.file_digest", use_file_digest, path))
+    hashes.use_sha256().use_hexdigesst()
+    digests.add(timeit("Hashes.of_file", hashes.of_file, path))
+    assert len(digests) == 1
+finally:
+    path.unlink()
+    path.parent.rmdir()
@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+
+"""
+Compare the serial and the concurrent ``fixa.hashes.Hashes.of_folder``.
+"""
+
+import os
+import time
+import shutil
+import tempfile
+from pathlib import Path
+
+from fixa.hashes import hashes
+
+N_FILES = 5000
+FILE_SIZE = 64 * 1024
+
+dir_tmp = Path(tempfile.mkdtemp())
+try:
+    for i in range(N_FILES):
+        path = dir_tmp / f"{i % 50}" / f"{i}.bin"
+        path.parent.mkdir(exist_ok=True)
+        path.write_bytes(os.urandom(FILE_SIZE))
+
+    hashes.use_sha256()
+    for max_workers in [1, 2, 4, 8, 16]:
+        st = time.perf_counter()
+        digest = hashes.of_folder(dir_tmp, max_workers=max_workers)
+        elapsed = time.perf_counter() - st
+        print(f"max_workers = {max_workers:>2}: {elapsed:.4f} sec, {digest}")
+finally:
+    shutil.rmtree(dir_tmp)
@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark ``fixa.iterable.flatten_all`` on very deep and very wide nests,
+the elapsed time should grow linearly with the number of leaves.
+"""
+
+import time
+
+from fixa.iterable import flatten_all
+
+
+def make_deep(depth: int) -> list:
+    nested = [0]
+    for i in range(1, depth):
+        nested = [nested, i]
+    return nested
+
+
+def make_wide(n_leaves: int, width: int = 1000) -> list:
+    return [list(range(width)) for _ in range(n_leaves // width)]
+
+
+def timeit(nested) -> float:
+    st = time.perf_counter()
+    for _ in flatten_all(nested):
+        pass
+    return time.perf_counter() - st
+
+
+for depth in [1_000, 10_000, 100_000]:
+    print(f"deep, depth = {depth:>10}: {timeit(make_deep(depth)):.4f} sec")
+
+for n_leaves in [100_000, 1_000_000, 10_000_000]:
+    print(f"wide, leaves = {n_leaves:>10}: {timeit(make_wide(n_leaves)):.4f} sec")
@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+
+"""
+Compare the pure Python path and the numpy backend of the window, shift and
+difference functions in ``fixa.iterable``.
+"""
+
+import time
+import collections
+import numpy as np
+
+from fixa import iterable
+
+N = 1_000_000
+SIZE = 10
+
+lst = list(range(N))
+arr = np.arange(N)
+
+
+def consume(windows):
+    # the numpy backend returns the 2D window view directly
+    if not isinstance(windows, np.ndarray):
+        collections.deque(windows, maxlen=0)
+
+
+def timeit(func, *args) -> float:
+    st = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - st
+
+
+cases = [
+    ("running_window", lambda x: consume(iterable.running_window(x, SIZE))),
+    ("cycle_running_window", lambda x: consume(iterable.cycle_running_window(x, SIZE))),
+    ("cyclic_shift", lambda x: iterable.cyclic_shift(x, SIZE)),
+    ("shift_and_trim", lambda x: iterable.shift_and_trim(x, SIZE)),
+    ("shift_and_pad", lambda x: iterable.shift_and_pad(x, SIZE)),
+    ("difference", lambda x: iterable.difference(x, SIZE)),
+]
+
+print(f"{'function':<24}{'python':>12}{'numpy':>12}{'speedup':>10}")
+for name, func in cases:
+    elapsed_py = timeit(func, lst)
+    elapsed_np = timeit(func, arr)
+    print(
+        f"{name:<24}{elapsed_py:>11.4f}s{elapsed_np:>11.4f}s"
+        f"{elapsed_py / elapsed_np:>9.1f}x"
+    )
@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+
+"""
+Compare the strategies to count the number of items in a generator.
+"""
+
+import time
+import itertools
+import collections
+
+from fixa.iterable import size_of_generator
+
+N = 10 ** 8
+
+
+def gen():
+    return itertools.repeat(None, N)
+
+
+def python_loop(generator) -> int:
+    counter = 0
+    for _ in generator:
+        counter += 1
+    return counter
+
+
+def sum_of_ones(generator) -> int:
+    return sum(1 for _ in generator)
+
+
+def deque_zip_count(generator) -> int:
+    counter = itertools.count()
+    collections.deque(zip(generator, counter), maxlen=0)
+    return next(counter)
+
+
+cases = [
+    ("python loop", python_loop),
+    ("sum of ones", sum_of_ones),
+    ("deque zip count", deque_zip_count),
+    ("size_of_generator", size_of_generator),
+]
+# materializing 10^8 items needs several GB of memory
+if N <= 10 ** 7:
+    cases.append(("len of list", lambda g: len(list(g))))
+
+for name, func in cases:
+    st = time.perf_counter()
+    assert func(gen()) == N
+    elapsed = time.perf_counter() - st
+    print(f"{name:<20}: {elapsed:.4f} sec")
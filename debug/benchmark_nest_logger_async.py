@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+
+"""
+Compare the log calls per second of ``fixa.nest_logger.NestedLogger`` in
+the synchronous mode and the async mode, with a slow stream that takes
+``WRITE_LATENCY`` seconds per write, like a network pipe.
+"""
+
+import io
+import time
+import logging
+
+from fixa.nest_logger import NestedLogger, OverflowEnum
+
+N = 20000
+WRITE_LATENCY = 0.00005
+
+
+class SlowStream(io.StringIO):
+    def write(self, s):
+        time.sleep(WRITE_LATENCY)
+        return super().write(s)
+
+
+def new_logger(name: str) -> NestedLogger:
+    logger = logging.getLogger(name)
+    logger.handlers.clear()
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    handler = logging.StreamHandler(SlowStream())
+    handler.setFormatter(logging.Formatter("[User %(asctime)s] %(message)s"))
+    logger.addHandler(handler)
+    return NestedLogger(logger=logger)
+
+
+def run(name: str, logger: NestedLogger):
+    st = time.perf_counter()
+    with logger.nested():
+        for i in range(N):
+            logger.info(f"line {i}")
+    elapsed_call = time.perf_counter() - st
+    logger.disable_async()
+    elapsed_total = time.perf_counter() - st
+    print(
+        f"{name:<12} {N / elapsed_call:>14,.0f} calls/s, "
+        f"all written in {elapsed_total:.2f} sec, dropped = {logger.dropped}"
+    )
+
+
+def main():
+    run("sync", new_logger("sync"))
+    run(
+        "async block",
+        new_logger("async_block").enable_async(
+            max_queue_size=N, overflow=OverflowEnum.block
+        ),
+    )
+    run(
+        "async drop",
+        new_logger("async_drop").enable_async(
+            max_queue_size=1000, overflow=OverflowEnum.drop
+        ),
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -9,33 +9,142 @@ Ref:
 """
 
 import typing as T
+import sys
+import array
 import bisect
+import itertools
+import concurrent.futures
 
-__version__ = "0.1.1"
+__version__ = "0.2.1"
 
-def find_index(sorted_array: list, x):
+# bisect supports the key parameter since Python3.10
+_HAS_BISECT_KEY = sys.version_info >= (3, 10)
+
+
+class _ReversedView:
+    """
+    A lazy reversed view of a sequence, no item is copied. It turns a
+    descending sequence into an ascending one.
+    """
+
+    __slots__ = ("_seq", "_last")
+
+    def __init__(self, seq: T.Sequence):
+        self._seq = seq
+        self._last = len(seq) - 1
+
+    def __len__(self) -> int:
+        return self._last + 1
+
+    def __getitem__(self, index: int):
+        if index < 0:
+            index += self._last + 1
+        if not (0 <= index <= self._last):
+            raise IndexError("index out of range")
+        return self._seq[self._last - index]
+
+
+class _KeyView:
+    """
+    A lazy view of ``key(item)`` of a sequence, no key list is created.
+    It is the fallback of the ``key`` parameter of ``bisect`` before Python3.10.
+    """
+
+    __slots__ = ("_seq", "_key")
+
+    def __init__(self, seq: T.Sequence, key: T.Callable):
+        self._seq = seq
+        self._key = key
+
+    def __len__(self) -> int:
+        return len(self._seq)
+
+    def __getitem__(self, index: int):
+        return self._key(self._seq[index])
+
+
+def _get_items(sorted_array: T.Sequence, reverse: bool) -> T.Sequence:
+    if reverse:
+        return _ReversedView(sorted_array)
+    return sorted_array
+
+
+def _bisect_left(items: T.Sequence, x, key: T.Optional[T.Callable] = None) -> int:
+    if key is None:
+        return bisect.bisect_left(items, x)
+    if _HAS_BISECT_KEY:
+        return bisect.bisect_left(items, x, key=key)
+    return bisect.bisect_left(_KeyView(items, key), x)  # pragma: no cover
+
+
+def _bisect_right(items: T.Sequence, x, key: T.Optional[T.Callable] = None) -> int:
+    if key is None:
+        return bisect.bisect_right(items, x)
+    if _HAS_BISECT_KEY:
+        return bisect.bisect_right(items, x, key=key)
+    return bisect.bisect_right(_KeyView(items, key), x)  # pragma: no cover
+
+
+def _identity(x):
+    return x
+
+
+def find_index(
+    sorted_array: list,
+    x,
+    key: T.Optional[T.Callable] = None,
+    reverse: bool = False,
+):
     """
     Locate the leftmost value exactly equal to x.
 
     :param sorted_array: a sorted iterable object that support index
     :param x: a comparable value
+    :param key: if given, ``sorted_array`` is sorted by ``key(item)`` and
+        ``x`` is compared with ``key(item)``, no key list is created.
+    :param reverse: if True, ``sorted_array`` is sorted in descending order,
+        no reversed copy is created.
+
+    Example::
+
+        >>> find_index([{"id": 1}, {"id": 2}], 2, key=lambda x: x["id"])
+        1
+
+        >>> find_index([3, 2, 1, 0], 1, reverse=True)
+        2
 
     **中文文档**
 
-    返回第一个值等于 x 的元素的索引.
+    返回第一个值等于 x 的元素的索引. ``key`` 和 ``reverse`` 参数与 ``sorted``
+    函数的含义相同, 且不会复制数据. 本模块中的其他函数也支持这两个参数.
     """
-    i = bisect.bisect_left(sorted_array, x)
-    if i != len(sorted_array) and sorted_array[i] == x:
-        return i
+    items = _get_items(sorted_array, reverse)
+    get_key = _identity if key is None else key
+    if reverse:
+        # the leftmost in the original array is the rightmost in the view
+        i = _bisect_right(items, x, key)
+        if i and get_key(items[i - 1]) == x:
+            return len(sorted_array) - i
+    else:
+        i = _bisect_left(items, x, key)
+        if i != len(items) and get_key(items[i]) == x:
+            return i
     raise ValueError
 
 
-def find_lt(sorted_array: list, x):
+def find_lt(
+    sorted_array: list,
+    x,
+    key: T.Optional[T.Callable] = None,
+    reverse: bool = False,
+):
     """
     Find rightmost value less than x.
 
     :param sorted_array: a sorted iterable object that support inex
     :param x: a comparable value
+    :param key: see :func:`find_index`
+    :param reverse: see :func:`find_index`
 
     Example::
 
@@ -46,18 +155,26 @@ def find_lt(sorted_array: list, x):
 
     寻找最大的小于 x 的数.
     """
-    i = bisect.bisect_left(sorted_array, x)
+    items = _get_items(sorted_array, reverse)
+    i = _bisect_left(items, x, key)
     if i:
-        return sorted_array[i - 1]
+        return items[i - 1]
     raise ValueError
 
 
-def find_le(sorted_array: list, x):
+def find_le(
+    sorted_array: list,
+    x,
+    key: T.Optional[T.Callable] = None,
+    reverse: bool = False,
+):
     """
     Find rightmost value less than or equal to x.
 
     :param sorted_array: a sorted iterable object that support inex
     :param x: a comparable value
+    :param key: see :func:`find_index`
+    :param reverse: see :func:`find_index`
 
     Example::
 
@@ -68,18 +185,26 @@ def find_le(sorted_array: list, x):
 
     寻找最大的小于等于 x 的数.
     """
-    i = bisect.bisect_right(sorted_array, x)
+    items = _get_items(sorted_array, reverse)
+    i = _bisect_right(items, x, key)
     if i:
-        return sorted_array[i - 1]
+        return items[i - 1]
     raise ValueError
 
 
-def find_gt(sorted_array: list, x):
+def find_gt(
+    sorted_array: list,
+    x,
+    key: T.Optional[T.Callable] = None,
+    reverse: bool = False,
+):
     """
     Find leftmost value greater than x.
 
     :param sorted_array: a sorted iterable object that support inex
     :param x: a comparable value
+    :param key: see :func:`find_index`
+    :param reverse: see :func:`find_index`
 
     Example::
 
@@ -90,18 +215,26 @@ def find_gt(sorted_array: list, x):
 
     寻找最小的大于 x 的数.
     """
-    i = bisect.bisect_right(sorted_array, x)
-    if i != len(sorted_array):
-        return sorted_array[i]
+    items = _get_items(sorted_array, reverse)
+    i = _bisect_right(items, x, key)
+    if i != len(items):
+        return items[i]
     raise ValueError
 
 
-def find_ge(sorted_array: list, x):
+def find_ge(
+    sorted_array: list,
+    x,
+    key: T.Optional[T.Callable] = None,
+    reverse: bool = False,
+):
     """
     Find leftmost item greater than or equal to x.
 
     :param array: a sorted iterable object that support inex
     :param x: a comparable value
+    :param key: see :func:`find_index`
+    :param reverse: see :func:`find_index`
 
     Example::
 
@@ -112,40 +245,51 @@ def find_ge(sorted_array: list, x):
 
     寻找最小的大于等于 x 的数.
     """
-    i = bisect.bisect_left(sorted_array, x)
-    if i != len(sorted_array):
-        return sorted_array[i]
+    items = _get_items(sorted_array, reverse)
+    i = _bisect_left(items, x, key)
+    if i != len(items):
+        return items[i]
     raise ValueError
 
 
-def find_nearest(sorted_array: list, x):
+def find_nearest(
+    sorted_array: list,
+    x,
+    key: T.Optional[T.Callable] = None,
+    reverse: bool = False,
+):
     """
     Find the nearest item of x from sorted array.
 
     :param sorted_array: a sorted iterable object that support inex
     :param x: a comparable value
-
-    note: for finding the nearest item from a descending array, I recommend
-    find_nearest(sorted_list[::-1], x). Because the built-in list[::-1] method
-    is super fast.
+    :param key: see :func:`find_index`, the distance is ``abs(key(item) - x)``
+    :param reverse: see :func:`find_index`, use ``reverse=True`` for
+        a descending array, it doesn't copy the array.
 
     Usage::
 
         >>> find_nearest([0, 1, 2, 3, 4, 5, 6, 7, 8, 9], 5.1)
         5
 
+        >>> find_nearest([9, 8, 7, 6, 5, 4, 3, 2, 1, 0], 5.1, reverse=True)
+        5
+
     **中文文档**
 
-    在正序数组中, 返回最接近 x 的数.
+    在正序数组中, 返回最接近 x 的数. 对于倒序数组, 使用 ``reverse=True``.
     """
-    if x <= sorted_array[0]:
-        return sorted_array[0]
-    elif x >= sorted_array[-1]:
-        return sorted_array[-1]
+    items = _get_items(sorted_array, reverse)
+    get_key = _identity if key is None else key
+    first, last = items[0], items[-1]
+    if x <= get_key(first):
+        return first
+    elif x >= get_key(last):
+        return last
     else:
-        lower = find_le(sorted_array, x)
-        upper = find_ge(sorted_array, x)
-        if (x - lower) > (upper - x):
+        lower = find_le(items, x, key)
+        upper = find_ge(items, x, key)
+        if (x - get_key(lower)) > (get_key(upper) - x):
             return upper
         else:
             return lower
@@ -181,10 +325,10 @@ def find_last_true(sorted_array: list, true_criterion: T.Callable):
 
     Solution::
 
-        # first, we check index = int((0 + 9)/2.0) = 4, it's True.
-        # Then check array[4 + 1], it's still True.
-        # Then we jump to int((4 + 9)/2.0) = 6, it's True.
-        # Then check array[6 + 1], ite's False. So array[6] is the one we need.
+        # first, we check index 0, it's True, and index 9, it's False.
+        # Then check index (0 + 9) // 2 = 4, it's True, the answer is in [4, 9).
+        # Then check index (4 + 9) // 2 = 6, it's True, the answer is in [6, 9).
+        # Then check index (6 + 9) // 2 = 7, it's False. So array[6] is the one we need.
 
         >>> find_last_true([0, 1, 2, 3, 4, 5, 6, 7, 8, 9], true_criterion)
         6
@@ -199,9 +343,10 @@ def find_last_true(sorted_array: list, true_criterion: T.Callable):
 
     算法:
 
-    我们检验最中间的元素, 如果为False, 那么则检验左边所有未检验过的元素的最中间
-    的那个。如果为True, 那么检验右边所有未检验过的元素的最中间那个。重复这一过程
-    直到被检验的元素为True, 而下一个元素为False, 说明找到了。
+    我们维护一个区间, 左端点为True, 右端点为False. 检验区间最中间的元素, 如果为
+    True, 则将其作为新的左端点, 否则作为新的右端点. 重复这一过程直到两个端点相邻,
+    左端点就是我们要找的. 每个元素最多只会被检验一次, 详见
+    :func:`find_last_true_in_range`.
 
     例题::
 
@@ -212,29 +357,863 @@ def find_last_true(sorted_array: list, true_criterion: T.Callable):
 
     解::
 
-        第一次检查``index = int((0+9)/2.0) = 4``, 为True,
-        检查array[4+1], 也是True。那么跳跃至``int((4+9)/2.0)=6``, 为True,。
-        再检查array[6+1], 为False, 很显然, 我们找到了。
+        首先检查 index 0 为True, index 9 为False. 然后检查 ``(0+9)//2 = 4``, 为True,
+        再检查 ``(4+9)//2 = 6``, 为True, 再检查 ``(6+9)//2 = 7``, 为False,
+        6 和 7 相邻, 很显然, 我们找到了。
+    """
+
+    return find_last_true_in_range(
+        predicate=lambda index: true_criterion(sorted_array[index]),
+        lower=0,
+        upper=len(sorted_array) - 1,
+    )
+
+
+def _evaluate(
+    predicate: T.Callable[[int], bool],
+    indices: T.List[int],
+    cache: T.Dict[int, bool],
+    executor: T.Optional[concurrent.futures.Executor],
+) -> T.List[bool]:
+    """
+    Evaluate the predicate on the indices, skip the cached ones, evaluate the
+    others concurrently if the executor is given.
+    """
+    todo = [index for index in dict.fromkeys(indices) if index not in cache]
+    if executor is None or len(todo) <= 1:
+        for index in todo:
+            cache[index] = bool(predicate(index))
+    else:
+        for index, value in zip(todo, executor.map(predicate, todo)):
+            cache[index] = bool(value)
+    return [cache[index] for index in indices]
+
+
+def _probe_points(lower: int, upper: int, n: int) -> T.List[int]:
+    """
+    Return at most n evenly spaced integers in the open interval
+    (lower, upper).
+    """
+    gap = upper - lower
+    n = min(n, gap - 1)
+    return sorted({lower + (gap * i) // (n + 1) for i in range(1, n + 1)})
+
+
+def find_last_true_in_range(
+    predicate: T.Callable[[int], bool],
+    lower: int = 0,
+    upper: T.Optional[int] = None,
+    max_workers: int = 1,
+    cache: T.Optional[T.Dict[int, bool]] = None,
+) -> int:
+    """
+    Suppose we have a monotone predicate on integers, it returns True for
+    ``lower, lower + 1, ...``, up to an integer, and returns False after that.
+    This function returns the last integer that the predicate returns True,
+    with the minimal number of predicate evaluations. It is useful when the
+    predicate is expensive, for example, probing the web pages to find the
+    last page that is not 404.
+
+    :param predicate: a callable function that takes an integer and returns
+        a boolean value.
+    :param lower: the predicate has to be True at ``lower``.
+    :param upper: the inclusive upper bound. If None, the range is unbounded,
+        it uses the exponential (galloping) search to find a False integer
+        first, in O(log(answer - lower)) evaluations.
+    :param max_workers: if greater than 1, evaluate ``max_workers`` points
+        concurrently in a thread pool in each round, it reduces the number of
+        rounds from log2(n) to log(n) / log(max_workers + 1). Good for I/O
+        bound predicates.
+    :param cache: a dict to memoize the predicate results, each integer is
+        evaluated at most once. You can pass the same dict across calls.
+
+    Example::
+
+        >>> find_last_true_in_range(lambda i: i <= 400, lower=1, upper=999)
+        400
+
+        >>> find_last_true_in_range(lambda i: i <= 400, lower=1)
+        400
+
+    **中文文档**
+
+    对整数区间上的单调谓词 (前面都是 True, 后面都是 False) 进行二分查找, 返回最后
+    一个为 True 的整数. 谓词的计算结果会被缓存, 每个整数最多只会被计算一次.
+    如果没有给定上界, 则先用指数搜索 (1, 2, 4, 8, ...) 找到第一个 False 的位置.
+    当 ``max_workers`` 大于 1 时, 每一轮在线程池中并发地检查多个点, 适合 I/O
+    密集型的谓词, 例如检查网页是否 404.
+    """
+    if cache is None:
+        cache = dict()
+    if max_workers < 1:
+        raise ValueError("max_workers has to be greater than zero!")
+    if (upper is not None) and (upper < lower):
+        raise ValueError("upper can not be smaller than lower!")
+
+    executor = None
+    if max_workers > 1:
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        # exam first item, if not true, then impossible to find result
+        if not _evaluate(predicate, [lower], cache, executor)[0]:
+            raise ValueError
+
+        # find an upper bound that is False
+        if upper is None:
+            step = 1
+            while True:
+                points = [lower + step * 2**i for i in range(max_workers)]
+                step = step * 2**max_workers
+                values = _evaluate(predicate, points, cache, executor)
+                if all(values):
+                    lower = points[-1]
+                    continue
+                first_false = values.index(False)
+                if first_false:
+                    lower = points[first_false - 1]
+                upper = points[first_false]
+                break
+        else:
+            # exam last item, if true, it is the one.
+            if _evaluate(predicate, [upper], cache, executor)[0]:
+                return upper
+
+        # now lower is True and upper is False
+        while upper - lower > 1:
+            points = _probe_points(lower, upper, max_workers)
+            values = _evaluate(predicate, points, cache, executor)
+            for point, value in zip(points, values):
+                if value:
+                    lower = point
+                else:
+                    upper = point
+                    break
+        return lower
+    finally:
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+
+# --- Batch Search ---
+def _as_ndarray(obj):
+    """
+    Return a numpy view of ``obj`` if it is a ``numpy.ndarray`` or an
+    ``array.array``, otherwise return None. numpy is an optional dependency.
+
+    It is kept in this module, so that ``binarysearch.py`` can still be
+    copied to other project as a standalone file.
+    """
+    # if obj is a numpy array, numpy is already imported
+    np = sys.modules.get("numpy")
+    if np is not None and isinstance(obj, np.ndarray):
+        return obj
+    if isinstance(obj, array.array):
+        try:
+            import numpy as np
+        except ImportError:  # pragma: no cover
+            return None
+        return np.asarray(obj)
+    return None
+
+
+def _to_sequence(queries: T.Iterable) -> T.Sequence:
+    if isinstance(queries, (list, tuple, array.array)) or (
+        _as_ndarray(queries) is not None
+    ):
+        return queries
+    return list(queries)
+
+
+def _bisect_many(
+    items: T.Sequence,
+    queries: T.Iterable,
+    right: bool,
+    queries_sorted: bool = False,
+    key: T.Optional[T.Callable] = None,
+) -> T.List[int]:
+    """
+    Return the ``bisect_left`` (or ``bisect_right``) insertion index of each
+    query.
+
+    - if ``items`` or ``queries`` is a numpy array or ``array.array``
+      and there is no key function, use the vectorized ``numpy.searchsorted``.
+    - if the queries are sorted and there are more queries than items,
+      use a linear merge sweep, O(N + M).
+    - if the queries are sorted, bisect from the previous index.
+    - otherwise, bisect each query, O(M * log(N)).
+    """
+    if key is None:
+        arr = _as_ndarray(items)
+        if isinstance(items, _ReversedView):
+            arr = _as_ndarray(items._seq)
+            if arr is not None:
+                arr = arr[::-1]  # a view, no copy
+        arr_queries = _as_ndarray(queries)
+        if (arr is not None) or (arr_queries is not None):
+            import numpy as np
+
+            if arr is None:
+                arr = items if isinstance(items, list) else list(items)
+            return np.searchsorted(
+                arr,
+                queries if arr_queries is None else arr_queries,
+                side="right" if right else "left",
+            ).tolist()
+
+    bisect_func = _bisect_right if right else _bisect_left
+    if not queries_sorted:
+        return [bisect_func(items, x, key) for x in queries]
+
+    queries = _to_sequence(queries)
+    keys = items if key is None else _KeyView(items, key)
+    n = len(items)
+    indices = list()
+    i = 0
+    if len(queries) >= n:  # merge sweep
+        if right:
+            for x in queries:
+                while i < n and not (x < keys[i]):
+                    i += 1
+                indices.append(i)
+        else:
+            for x in queries:
+                while i < n and keys[i] < x:
+                    i += 1
+                indices.append(i)
+    else:
+        bisect_func = bisect.bisect_right if right else bisect.bisect_left
+        for x in queries:
+            i = bisect_func(keys, x, i)
+            indices.append(i)
+    return indices
+
+
+def find_index_many(
+    sorted_array: list,
+    queries: T.Iterable,
+    queries_sorted: bool = False,
+    default: T.Any = None,
+    key: T.Optional[T.Callable] = None,
+    reverse: bool = False,
+) -> list:
+    """
+    Batch version of :func:`find_index`, return the index for each query,
+    or ``default`` if not found.
+
+    :param sorted_array: a sorted iterable object that support index
+    :param queries: an iterable of comparable values
+    :param queries_sorted: if True, the queries are sorted in ascending
+        order, it enables the O(N + M) merge sweep.
+    :param default: the value for the query that has no answer
+    :param key: see :func:`find_index`
+    :param reverse: see :func:`find_index`
+
+    If ``sorted_array`` or ``queries`` is a ``numpy.ndarray`` or ``array.array``,
+    it uses ``numpy.searchsorted``.
+
+    Example::
+
+        >>> find_index_many([0, 1, 2, 3], [2, 5])
+        [2, None]
+
+    **中文文档**
+
+    :func:`find_index` 的批量版本. 如果 queries 是已排序的, 则可以设置
+    ``queries_sorted=True`` 以使用归并扫描. 如果输入是 numpy 数组, 则使用
+    ``numpy.searchsorted``.
+    """
+    items = _get_items(sorted_array, reverse)
+    get_key = _identity if key is None else key
+    queries = _to_sequence(queries)
+    n = len(items)
+    results = list()
+    if reverse:
+        # the leftmost in the original array is the rightmost in the view
+        indices = _bisect_many(items, queries, True, queries_sorted, key)
+        for x, i in zip(queries, indices):
+            if i and get_key(items[i - 1]) == x:
+                results.append(n - i)
+            else:
+                results.append(default)
+    else:
+        indices = _bisect_many(items, queries, False, queries_sorted, key)
+        for x, i in zip(queries, indices):
+            if i != n and get_key(items[i]) == x:
+                results.append(i)
+            else:
+                results.append(default)
+    return results
+
+
+def find_lt_many(
+    sorted_array: list,
+    queries: T.Iterable,
+    queries_sorted: bool = False,
+    default: T.Any = None,
+    key: T.Optional[T.Callable] = None,
+    reverse: bool = False,
+) -> list:
+    """
+    Batch version of :func:`find_lt`, see :func:`find_index_many`.
+
+    Example::
+
+        >>> find_lt_many([0, 1, 2, 3], [2.5, 0])
+        [2, None]
+
+    **中文文档**
+
+    :func:`find_lt` 的批量版本.
+    """
+    items = _get_items(sorted_array, reverse)
+    return [
+        items[i - 1] if i else default
+        for i in _bisect_many(items, queries, False, queries_sorted, key)
+    ]
+
+
+def find_le_many(
+    sorted_array: list,
+    queries: T.Iterable,
+    queries_sorted: bool = False,
+    default: T.Any = None,
+    key: T.Optional[T.Callable] = None,
+    reverse: bool = False,
+) -> list:
+    """
+    Batch version of :func:`find_le`, see :func:`find_index_many`.
+
+    Example::
+
+        >>> find_le_many([0, 1, 2, 3], [2.0, -1])
+        [2, None]
+
+    **中文文档**
+
+    :func:`find_le` 的批量版本.
+    """
+    items = _get_items(sorted_array, reverse)
+    return [
+        items[i - 1] if i else default
+        for i in _bisect_many(items, queries, True, queries_sorted, key)
+    ]
+
+
+def find_gt_many(
+    sorted_array: list,
+    queries: T.Iterable,
+    queries_sorted: bool = False,
+    default: T.Any = None,
+    key: T.Optional[T.Callable] = None,
+    reverse: bool = False,
+) -> list:
+    """
+    Batch version of :func:`find_gt`, see :func:`find_index_many`.
+
+    Example::
+
+        >>> find_gt_many([0, 1, 2, 3], [0.5, 3])
+        [1, None]
+
+    **中文文档**
+
+    :func:`find_gt` 的批量版本.
+    """
+    items = _get_items(sorted_array, reverse)
+    n = len(items)
+    return [
+        items[i] if i != n else default
+        for i in _bisect_many(items, queries, True, queries_sorted, key)
+    ]
+
+
+def find_ge_many(
+    sorted_array: list,
+    queries: T.Iterable,
+    queries_sorted: bool = False,
+    default: T.Any = None,
+    key: T.Optional[T.Callable] = None,
+    reverse: bool = False,
+) -> list:
+    """
+    Batch version of :func:`find_ge`, see :func:`find_index_many`.
+
+    Example::
+
+        >>> find_ge_many([0, 1, 2, 3], [1.0, 4])
+        [1, None]
+
+    **中文文档**
+
+    :func:`find_ge` 的批量版本.
+    """
+    items = _get_items(sorted_array, reverse)
+    n = len(items)
+    return [
+        items[i] if i != n else default
+        for i in _bisect_many(items, queries, False, queries_sorted, key)
+    ]
+
+
+def find_nearest_many(
+    sorted_array: list,
+    queries: T.Iterable,
+    queries_sorted: bool = False,
+    key: T.Optional[T.Callable] = None,
+    reverse: bool = False,
+) -> list:
+    """
+    Batch version of :func:`find_nearest`, see :func:`find_index_many`.
+
+    Example::
+
+        >>> find_nearest_many([0, 1, 2, 3, 4, 5, 6, 7, 8, 9], [5.1, -1, 100])
+        [5, 0, 9]
+
+    **中文文档**
+
+    :func:`find_nearest` 的批量版本.
+    """
+    items = _get_items(sorted_array, reverse)
+    get_key = _identity if key is None else key
+    queries = _to_sequence(queries)
+    first, last = items[0], items[-1]
+    first_key, last_key = get_key(first), get_key(last)
+    results = list()
+    indices = _bisect_many(items, queries, False, queries_sorted, key)
+    for x, i in zip(queries, indices):
+        if x <= first_key:
+            results.append(first)
+        elif x >= last_key:
+            results.append(last)
+        else:
+            upper = items[i]
+            upper_key = get_key(upper)
+            if upper_key == x:
+                results.append(upper)
+            else:
+                lower = items[i - 1]
+                if (x - get_key(lower)) > (upper_key - x):
+                    results.append(upper)
+                else:
+                    results.append(lower)
+    return results
+
+
+# --- Sorted Container ---
+class SortedList:
+    """
+    A sorted list that supports O(log n) insertion and deletion, and the
+    same ``find_index``, ``find_lt``, ``find_le``, ``find_gt``, ``find_ge``,
+    ``find_nearest`` semantics as the module level functions.
+
+    Items are stored in a list of sorted sub lists (chunks), each chunk has
+    at most ``2 * load`` items. ``_maxes`` stores the max value of each chunk.
+    An insertion bisects ``_maxes`` to locate the chunk, then ``insort`` into
+    the chunk, it only moves O(load) items instead of O(n) items of
+    ``bisect.insort`` on a flat list.
+
+    Example::
+
+        >>> sl = SortedList([3, 1, 2])
+        >>> sl.add(0)
+        >>> list(sl)
+        [0, 1, 2, 3]
+        >>> sl.find_lt(2.5)
+        2
+
+    **中文文档**
+
+    一个支持 O(log n) 插入和删除的有序列表, 并提供与本模块中的函数相同语义的
+    ``find_index``, ``find_lt``, ``find_le``, ``find_gt``, ``find_ge``,
+    ``find_nearest`` 方法. 内部使用分块的有序列表实现, 每次插入只需要移动一个块
+    内的元素, 而不是像 ``bisect.insort`` 那样移动整个列表.
     """
 
-    # exam first item, if not true, then impossible to find result
-    if not true_criterion(sorted_array[0]):
+    def __init__(
+        self,
+        iterable: T.Optional[T.Iterable] = None,
+        load: int = 1000,
+    ):
+        if load < 1:
+            raise ValueError("load has to be greater than zero!")
+        self._load = load
+        self._lists: T.List[list] = list()
+        self._maxes: list = list()
+        self._len = 0
+        # ``_offsets[i]`` is the global index of the first item of the i-th
+        # chunk, it is lazily rebuilt after modification
+        self._offsets: T.Optional[T.List[int]] = None
+        if iterable is not None:
+            self.update(iterable)
+
+    def __len__(self) -> int:
+        return self._len
+
+    def __iter__(self):
+        return itertools.chain.from_iterable(self._lists)
+
+    def __reversed__(self):
+        for chunk in reversed(self._lists):
+            for value in reversed(chunk):
+                yield value
+
+    def __contains__(self, value) -> bool:
+        pos = bisect.bisect_left(self._maxes, value)
+        if pos == len(self._maxes):
+            return False
+        chunk = self._lists[pos]
+        return chunk[bisect.bisect_left(chunk, value)] == value
+
+    def __getitem__(self, index: int):
+        if index < 0:
+            index += self._len
+        if not (0 <= index < self._len):
+            raise IndexError("SortedList index out of range")
+        offsets = self._get_offsets()
+        pos = bisect.bisect_right(offsets, index) - 1
+        return self._lists[pos][index - offsets[pos]]
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({list(self)!r})"
+
+    def _get_offsets(self) -> T.List[int]:
+        if self._offsets is None:
+            self._offsets = list(
+                itertools.accumulate(
+                    itertools.chain([0], (len(chunk) for chunk in self._lists[:-1]))
+                )
+            )
+        return self._offsets
+
+    def _split(self, pos: int):
+        chunk = self._lists[pos]
+        half = chunk[self._load :]
+        del chunk[self._load :]
+        self._maxes[pos] = chunk[-1]
+        self._lists.insert(pos + 1, half)
+        self._maxes.insert(pos + 1, half[-1])
+
+    def add(self, value):
+        """
+        Insert a value, keep the list sorted.
+        """
+        maxes = self._maxes
+        if maxes:
+            pos = bisect.bisect_right(maxes, value)
+            if pos == len(maxes):
+                pos -= 1
+                self._lists[pos].append(value)
+                maxes[pos] = value
+            else:
+                bisect.insort_right(self._lists[pos], value)
+            if len(self._lists[pos]) > 2 * self._load:
+                self._split(pos)
+        else:
+            self._lists.append([value])
+            maxes.append(value)
+        self._len += 1
+        self._offsets = None
+
+    def update(self, iterable: T.Iterable):
+        """
+        Insert many values, it rebuilds the chunks in O(n log n).
+        """
+        values = sorted(itertools.chain(self, iterable))
+        load = self._load
+        self._lists = [values[i : i + load] for i in range(0, len(values), load)]
+        self._maxes = [chunk[-1] for chunk in self._lists]
+        self._len = len(values)
+        self._offsets = None
+
+    def remove(self, value):
+        """
+        Remove the leftmost value that is equal to ``value``, raise
+        ``ValueError`` if not found.
+        """
+        pos = bisect.bisect_left(self._maxes, value)
+        if pos != len(self._maxes):
+            chunk = self._lists[pos]
+            i = bisect.bisect_left(chunk, value)
+            if chunk[i] == value:
+                del chunk[i]
+                if chunk:
+                    self._maxes[pos] = chunk[-1]
+                else:
+                    del self._lists[pos]
+                    del self._maxes[pos]
+                self._len -= 1
+                self._offsets = None
+                return
+        raise ValueError(f"{value!r} not in SortedList")
+
+    def discard(self, value):
+        """
+        Remove the leftmost value that is equal to ``value`` if exists.
+        """
+        try:
+            self.remove(value)
+        except ValueError:
+            pass
+
+    def bisect_left(self, value) -> int:
+        """
+        Same as ``bisect.bisect_left`` on the flat sorted list.
+        """
+        pos = bisect.bisect_left(self._maxes, value)
+        if pos == len(self._maxes):
+            return self._len
+        return self._get_offsets()[pos] + bisect.bisect_left(self._lists[pos], value)
+
+    def bisect_right(self, value) -> int:
+        """
+        Same as ``bisect.bisect_right`` on the flat sorted list.
+        """
+        pos = bisect.bisect_right(self._maxes, value)
+        if pos == len(self._maxes):
+            return self._len
+        return self._get_offsets()[pos] + bisect.bisect_right(self._lists[pos], value)
+
+    def find_index(self, x) -> int:
+        """
+        Locate the leftmost value exactly equal to x. See :func:`find_index`.
+        """
+        i = self.bisect_left(x)
+        if i != self._len and self[i] == x:
+            return i
         raise ValueError
 
-    # exam last item, if true, it is the one.
-    if true_criterion(sorted_array[-1]):
-        return sorted_array[-1]
+    def find_lt(self, x):
+        """
+        Find rightmost value less than x. See :func:`find_lt`.
+        """
+        pos = bisect.bisect_left(self._maxes, x)
+        if pos != len(self._maxes):
+            chunk = self._lists[pos]
+            i = bisect.bisect_left(chunk, x)
+            if i:
+                return chunk[i - 1]
+        if pos:
+            return self._lists[pos - 1][-1]
+        raise ValueError
 
-    lower, upper = 0, len(sorted_array) - 1
+    def find_le(self, x):
+        """
+        Find rightmost value less than or equal to x. See :func:`find_le`.
+        """
+        pos = bisect.bisect_right(self._maxes, x)
+        if pos != len(self._maxes):
+            chunk = self._lists[pos]
+            i = bisect.bisect_right(chunk, x)
+            if i:
+                return chunk[i - 1]
+        if pos:
+            return self._lists[pos - 1][-1]
+        raise ValueError
+
+    def find_gt(self, x):
+        """
+        Find leftmost value greater than x. See :func:`find_gt`.
+        """
+        pos = bisect.bisect_right(self._maxes, x)
+        if pos != len(self._maxes):
+            chunk = self._lists[pos]
+            return chunk[bisect.bisect_right(chunk, x)]
+        raise ValueError
+
+    def find_ge(self, x):
+        """
+        Find leftmost item greater than or equal to x. See :func:`find_ge`.
+        """
+        pos = bisect.bisect_left(self._maxes, x)
+        if pos != len(self._maxes):
+            chunk = self._lists[pos]
+            return chunk[bisect.bisect_left(chunk, x)]
+        raise ValueError
 
-    index = int((lower + upper) / 2.0)
-    while 1:
-        if true_criterion(sorted_array[index]):
-            if true_criterion(sorted_array[index + 1]):
-                lower = index
-                index = int((index + upper) / 2.0)
+    def find_nearest(self, x):
+        """
+        Find the nearest item of x. See :func:`find_nearest`.
+        """
+        if not self._len:
+            raise ValueError
+        first, last = self._lists[0][0], self._lists[-1][-1]
+        if x <= first:
+            return first
+        elif x >= last:
+            return last
+        else:
+            lower = self.find_le(x)
+            upper = self.find_ge(x)
+            if (x - lower) > (upper - x):
+                return upper
             else:
-                return index
+                return lower
+
+
+# --- Interval Index ---
+class _IntervalNode:
+    """
+    A node of the centered interval tree. It stores the intervals that
+    contain the center point, sorted by start in ascending order and by end
+    in descending order.
+    """
+
+    __slots__ = ("center", "by_start", "by_end", "left", "right")
+
+    def __init__(self, center, by_start: list, by_end: list, left, right):
+        self.center = center
+        self.by_start = by_start
+        self.by_end = by_end
+        self.left: T.Optional["_IntervalNode"] = left
+        self.right: T.Optional["_IntervalNode"] = right
+
+
+def _build_interval_tree(
+    by_start: list,
+    by_end: list,
+) -> T.Optional[_IntervalNode]:
+    """
+    :param by_start: intervals sorted by start in ascending order.
+    :param by_end: the same intervals sorted by end in descending order.
+    """
+    if not by_start:
+        return None
+    # the start of the median interval is the center, so this node is never
+    # empty, and each child has at most half of the intervals
+    center = by_start[len(by_start) // 2][0]
+    left_by_start, center_by_start, right_by_start = list(), list(), list()
+    for interval in by_start:
+        if interval[1] < center:
+            left_by_start.append(interval)
+        elif center < interval[0]:
+            right_by_start.append(interval)
+        else:
+            center_by_start.append(interval)
+    left_by_end, center_by_end, right_by_end = list(), list(), list()
+    for interval in by_end:
+        if interval[1] < center:
+            left_by_end.append(interval)
+        elif center < interval[0]:
+            right_by_end.append(interval)
         else:
-            upper = index
-            index = int((lower + index) / 2.0)
+            center_by_end.append(interval)
+    return _IntervalNode(
+        center=center,
+        by_start=center_by_start,
+        by_end=center_by_end,
+        left=_build_interval_tree(left_by_start, left_by_end),
+        right=_build_interval_tree(right_by_start, right_by_end),
+    )
+
+
+class IntervalIndex:
+    """
+    A static index of closed intervals ``[start, end]`` for point-stabbing
+    and overlap queries. Each interval is a tuple ``(start, end, ...)``,
+    the extra items are payload, the query returns the original tuples.
+
+    - :meth:`stab` and :meth:`overlap` take O(log n + k), k is the number of
+      results. It uses a centered interval tree, plus the intervals sorted by
+      start.
+    - :meth:`count_stab` and :meth:`count_overlap` take O(log n), they bisect
+      the sorted starts and the sorted ends.
+    - It is built in O(n log n). It is immutable, build a new one if the
+      intervals change.
+
+    Example::
+
+        >>> index = IntervalIndex([(1, 5, "a"), (3, 8, "b"), (10, 12, "c")])
+        >>> sorted(index.stab(4))
+        [(1, 5, "a"), (3, 8, "b")]
+        >>> sorted(index.overlap(6, 10))
+        [(3, 8, "b"), (10, 12, "c")]
+        >>> index.count_overlap(6, 10)
+        2
+
+    **中文文档**
+
+    闭区间索引, 用于查询包含某个点的所有区间, 以及与某个区间有重叠的所有区间.
+    查询的复杂度为 O(log n + k), k 为结果的个数. 仅计数的复杂度为 O(log n).
+    索引一旦建立就不可修改, 构建的复杂度为 O(n log n).
+    """
+
+    def __init__(self, intervals: T.Iterable[tuple]):
+        intervals = list(intervals)
+        for interval in intervals:
+            if interval[1] < interval[0]:
+                raise ValueError(f"invalid interval {interval!r}, end < start")
+        get_start = lambda x: x[0]
+        get_end = lambda x: x[1]
+        self._by_start = sorted(intervals, key=get_start)
+        self._starts = [interval[0] for interval in self._by_start]
+        self._ends = sorted(interval[1] for interval in intervals)
+        self._root = _build_interval_tree(
+            self._by_start,
+            sorted(intervals, key=get_end, reverse=True),
+        )
+
+    def __len__(self) -> int:
+        return len(self._by_start)
+
+    def __iter__(self):
+        return iter(self._by_start)
+
+    def stab(self, point) -> T.List[tuple]:
+        """
+        Find all intervals that contain the point, ``start <= point <= end``.
+        The order of the results is not specified.
+        """
+        results = list()
+        node = self._root
+        while node is not None:
+            if point < node.center:
+                # all intervals in this node end after the point
+                for interval in node.by_start:
+                    if point < interval[0]:
+                        break
+                    results.append(interval)
+                node = node.left
+            elif node.center < point:
+                # all intervals in this node start before the point
+                for interval in node.by_end:
+                    if interval[1] < point:
+                        break
+                    results.append(interval)
+                node = node.right
+            else:
+                results.extend(node.by_start)
+                break
+        return results
+
+    def overlap(self, start, end) -> T.List[tuple]:
+        """
+        Find all intervals that overlap with ``[start, end]``. They either
+        contain ``start``, or start in ``(start, end]``. The order of the
+        results is not specified.
+        """
+        if end < start:
+            raise ValueError("end can not be smaller than start!")
+        results = self.stab(start)
+        lower = bisect.bisect_right(self._starts, start)
+        upper = bisect.bisect_right(self._starts, end)
+        results.extend(self._by_start[lower:upper])
+        return results
+
+    def count_stab(self, point) -> int:
+        """
+        Count the intervals that contain the point.
+        """
+        return self.count_overlap(point, point)
+
+    def count_overlap(self, start, end) -> int:
+        """
+        Count the intervals that overlap with ``[start, end]``, it equals to
+        the number of intervals that start before ``end``, minus the number
+        of intervals that end before ``start``.
+        """
+        if end < start:
+            raise ValueError("end can not be smaller than start!")
+        return bisect.bisect_right(self._starts, end) - bisect.bisect_left(
+            self._ends, start
+        )
@@ -21,11 +21,20 @@ Ref:
 """
 
 import typing as T
+import io
+import os
 import enum
+import mmap
+import time
+import sqlite3
+import zlib
 import hashlib
+import threading
+import concurrent.futures
 from pathlib import Path
 
-__version__ = "0.1.1"
+__version__ = "0.2.1"
+
 
 class HashAlgoEnum(str, enum.Enum):
     md5 = "md5"
@@ -34,6 +43,477 @@ class HashAlgoEnum(str, enum.Enum):
     sha256 = "sha256"
     sha384 = "sha384"
     sha512 = "sha512"
+    # fast, but still cryptographic
+    blake2b = "blake2b"
+    blake2s = "blake2s"
+    # non-cryptographic, only for change detection and deduplication
+    crc32 = "crc32"
+    xxh64 = "xxh64"  # requires ``pip install xxhash``
+    xxh3_64 = "xxh3_64"  # requires ``pip install xxhash``
+    xxh3_128 = "xxh3_128"  # requires ``pip install xxhash``
+
+
+_XXHASH_ALGOS = {
+    HashAlgoEnum.xxh64,
+    HashAlgoEnum.xxh3_64,
+    HashAlgoEnum.xxh3_128,
+}
+
+
+class Crc32:
+    """
+    A hashlib style wrapper of ``zlib.crc32``. The digest is the 4 bytes big
+    endian unsigned integer.
+    """
+
+    name = "crc32"
+    digest_size = 4
+
+    def __init__(self, data: bytes = b""):
+        self.value = zlib.crc32(data)
+
+    def update(self, data):
+        self.value = zlib.crc32(data, self.value)
+
+    def digest(self) -> bytes:
+        return self.value.to_bytes(4, "big")
+
+    def hexdigest(self) -> str:
+        return f"{self.value:08x}"
+
+    def copy(self) -> "Crc32":
+        m = Crc32()
+        m.value = self.value
+        return m
+
+
+def _get_constructor(algo: HashAlgoEnum) -> T.Callable:
+    """
+    Return the function to create a new hash object of the algorithm.
+    """
+    algo = HashAlgoEnum(algo)
+    if algo is HashAlgoEnum.crc32:
+        return Crc32
+    if algo in _XXHASH_ALGOS:
+        try:
+            import xxhash
+        except ImportError:  # pragma: no cover
+            raise ImportError(
+                f"{algo.value!r} requires the xxhash package, "
+                f"run 'pip install xxhash' to install it"
+            )
+        return getattr(xxhash, algo.value)
+    return getattr(hashlib, algo.value)
+
+
+#: the default chunk size to read file, hashlib only releases the GIL for
+#: data larger than 2KB, and 1MB is the sweet spot in the benchmark
+#: ``debug/benchmark_hashes_of_file.py``
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+
+#: with ``use_mmap=None``, use mmap to hash the file if it is larger than
+#: this size
+MMAP_THRESHOLD = 64 * 1024 * 1024
+
+
+def _update_from_file_object(
+    m,
+    f,
+    nbytes: int = 0,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+):
+    """
+    Feed the content of a file object to the hash object, only the first
+    n bytes if ``nbytes`` is not 0.
+    """
+    if nbytes:
+        chunk_size = min(chunk_size, nbytes)
+    if not hasattr(f, "readinto"):
+        remains = nbytes
+        while True:
+            size = min(chunk_size, remains) if nbytes else chunk_size
+            data = f.read(size)
+            if not data:
+                break
+            m.update(data)
+            if nbytes:
+                remains -= len(data)
+                if not remains:
+                    break
+        return
+
+    buffer = bytearray(chunk_size)
+    view = memoryview(buffer)
+    remains = nbytes
+    while True:
+        if nbytes:
+            n = f.readinto(view[: min(chunk_size, remains)])
+        else:
+            n = f.readinto(buffer)
+        if not n:
+            break
+        m.update(view[:n])
+        if nbytes:
+            remains -= n
+            if not remains:
+                break
+
+
+def _update_from_mmap(m, f, nbytes: int = 0):
+    """
+    Feed the content of a memory mapped file to the hash object.
+    """
+    if os.fstat(f.fileno()).st_size == 0:  # cannot mmap an empty file
+        return
+    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        with memoryview(mm) as view:
+            if nbytes:
+                m.update(view[:nbytes])
+            else:
+                m.update(view)
+
+
+def _update_from_file(
+    m,
+    p: Path,
+    nbytes: int = 0,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    use_mmap: T.Optional[bool] = False,
+):
+    """
+    Feed the content of a file to the hash object, see :meth:`Hashes.of_file`.
+    """
+    with p.open("rb") as f:
+        if use_mmap is None:
+            size = os.fstat(f.fileno()).st_size
+            if nbytes:
+                size = min(size, nbytes)
+            use_mmap = size >= MMAP_THRESHOLD
+        if use_mmap:
+            _update_from_mmap(m, f, nbytes)
+        else:
+            _update_from_file_object(m, f, nbytes, chunk_size)
+
+
+class _MultiHash:
+    """
+    Feed the same data to multiple hash objects, so the data is read once.
+    """
+
+    def __init__(self, hash_objects: list):
+        self.hash_objects = hash_objects
+
+    def update(self, data):
+        for m in self.hash_objects:
+            m.update(data)
+
+
+class S3ETag:
+    """
+    Compute the ETag of an S3 object uploaded by boto3 / AWS CLI, it has the
+    same ``update`` / ``hexdigest`` interface as the hashlib objects. The
+    ETag of a single part upload is the md5 of the content, and the ETag of
+    a multipart upload is the md5 of the concatenated md5 digests of all
+    parts, followed by ``-{number of parts}``.
+
+    The default ``part_size`` and ``multipart_threshold`` are the same as
+    the default ``boto3.s3.transfer.TransferConfig``. The returned value
+    doesn't have the double quotes that S3 returns.
+
+    **中文文档**
+
+    计算用 boto3 / AWS CLI 上传的 S3 对象的 ETag. 单个 part 上传的 ETag 是文件的 md5,
+    multipart 上传的 ETag 是所有 part 的 md5 拼接之后的 md5, 后面加上 ``-{part 的数量}``.
+    """
+
+    name = "s3_etag"
+
+    def __init__(
+        self,
+        part_size: int = 8 * 1024 * 1024,
+        multipart_threshold: int = 8 * 1024 * 1024,
+    ):
+        if part_size < 1:
+            raise ValueError("part_size cannot smaller than 1")
+        self.part_size = part_size
+        self.multipart_threshold = multipart_threshold
+        self._size = 0
+        self._part = hashlib.md5()
+        self._part_bytes = 0
+        self._part_digests: T.List[bytes] = list()
+        # the md5 of the first part is not the md5 of the content if there
+        # are multiple parts but it is still a single part upload
+        if multipart_threshold > part_size:
+            self._whole = hashlib.md5()
+        else:
+            self._whole = None
+
+    def update(self, data):
+        view = memoryview(data).cast("B")
+        self._size += len(view)
+        if self._whole is not None:
+            self._whole.update(view)
+        while len(view):
+            n = min(len(view), self.part_size - self._part_bytes)
+            self._part.update(view[:n])
+            self._part_bytes += n
+            view = view[n:]
+            if self._part_bytes == self.part_size:
+                self._part_digests.append(self._part.digest())
+                self._part = hashlib.md5()
+                self._part_bytes = 0
+
+    def hexdigest(self) -> str:
+        digests = list(self._part_digests)
+        if self._part_bytes or (not digests):
+            digests.append(self._part.digest())
+        if self._size < self.multipart_threshold:
+            if self._whole is not None:
+                return self._whole.hexdigest()
+            return digests[0].hex()
+        return f"{hashlib.md5(b''.join(digests)).hexdigest()}-{len(digests)}"
+
+
+class HashingReader(io.RawIOBase):
+    """
+    A read only file object wrapper that updates the hash object with the
+    data read through it. So the data can be hashed while it is consumed by
+    another reader, for example, ``s3_client.upload_fileobj``.
+
+    Closing the wrapper doesn't close the wrapped file object, and it is
+    safe to close the wrapper after the wrapped file object is closed.
+
+    Usage::
+
+        >>> with open("file.txt", "rb") as f:
+        ...     reader = hashes.reader(f)
+        ...     s3_client.upload_fileobj(reader, bucket, key)
+        ...     print(reader.hexdigest())
+
+    **中文文档**
+
+    只读的文件对象的包装, 数据被读取的同时更新哈希值. 这样在把数据交给别的程序处理
+    (例如上传到 S3) 的同时就能计算哈希值, 不需要再读一遍.
+    """
+
+    def __init__(self, f, hash_object):
+        self.f = f
+        self.hash_object = hash_object
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        view = memoryview(b).cast("B")
+        if hasattr(self.f, "readinto"):
+            n = self.f.readinto(view)
+        else:
+            data = self.f.read(len(view))
+            n = len(data)
+            view[:n] = data
+        if n:
+            self.hash_object.update(view[:n])
+        return n
+
+    def digest(self) -> bytes:
+        return self.hash_object.digest()
+
+    def hexdigest(self) -> str:
+        return self.hash_object.hexdigest()
+
+
+class HashingWriter(io.RawIOBase):
+    """
+    A write only file object wrapper that updates the hash object with the
+    data written through it.
+
+    Closing the wrapper doesn't close the wrapped file object.
+
+    **中文文档**
+
+    只写的文件对象的包装, 数据被写入的同时更新哈希值.
+    """
+
+    def __init__(self, f, hash_object):
+        self.f = f
+        self.hash_object = hash_object
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, b) -> int:
+        n = self.f.write(b)
+        view = memoryview(b).cast("B")
+        if n is None:  # pragma: no cover
+            n = len(view)
+        if n:
+            self.hash_object.update(view[:n])
+        return n
+
+    def flush(self):
+        # the wrapped file may be closed before the wrapper, e.g. the wrapper
+        # is created inside ``with open(...)``, and then closed by the
+        # finalizer of IOBase
+        if not (self.closed or getattr(self.f, "closed", False)):
+            self.f.flush()
+
+    def digest(self) -> bytes:
+        return self.hash_object.digest()
+
+    def hexdigest(self) -> str:
+        return self.hash_object.hexdigest()
+
+
+class HashCache:
+    """
+    A persistent cache of file hash values, backed by a sqlite database.
+    A cached hash value is reused only if the path, size, modification time
+    and inode of the file are all unchanged, otherwise the file is re-hashed.
+
+    Usage::
+
+        >>> with HashCache("/path/to/.hashes.sqlite") as cache:
+        ...     hashes.of_folder("/path/to/folder", cache=cache)
+
+    :param path: the path of the sqlite database file, use ``":memory:"``
+        for an in-memory cache.
+    :param verify: if True, always re-hash the file, and record the path
+        into ``mismatched`` if the cached value is wrong. It is useful to
+        detect tools that modify file content but keep the mtime.
+    :param racy_seconds: a file modified within this many seconds before
+        it is hashed is not cached, because another write within the same
+        mtime granularity cannot be detected.
+
+    **中文文档**
+
+    将文件的哈希值持久化保存在 sqlite 数据库中. 只有当文件的路径, 大小, 修改时间,
+    inode 都没有变化时才会使用缓存, 否则重新计算哈希值. ``verify=True`` 时总是重新计算,
+    并把与缓存不一致的文件路径记录在 ``mismatched`` 中.
+    """
+
+    def __init__(
+        self,
+        path: T.Union[str, Path, T.Any],
+        verify: bool = False,
+        racy_seconds: float = 2.0,
+    ):
+        self.path = str(path)
+        self.verify = verify
+        self.racy_seconds = racy_seconds
+        self.mismatched: T.List[str] = list()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS hash_cache ("
+            "path TEXT NOT NULL, "
+            "algo TEXT NOT NULL, "
+            "size INTEGER NOT NULL, "
+            "mtime_ns INTEGER NOT NULL, "
+            "inode INTEGER NOT NULL, "
+            "digest BLOB NOT NULL, "
+            "PRIMARY KEY (path, algo))"
+        )
+        self._conn.commit()
+
+    def get(
+        self,
+        path: Path,
+        st: os.stat_result,
+        algo: str,
+    ) -> T.Optional[bytes]:
+        """
+        Return the cached digest in bytes, or None if not cached or the
+        file is changed.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT size, mtime_ns, inode, digest FROM hash_cache "
+                "WHERE path = ? AND algo = ?",
+                (str(path.absolute()), algo),
+            ).fetchone()
+        if row is None:
+            return None
+        size, mtime_ns, inode, digest = row
+        if (size, mtime_ns, inode) != (st.st_size, st.st_mtime_ns, st.st_ino):
+            return None
+        return digest
+
+    def set(
+        self,
+        path: Path,
+        st: os.stat_result,
+        algo: str,
+        digest: bytes,
+    ):
+        """
+        Save the digest of a file, ``st`` is the stat result before hashing.
+        """
+        if (time.time_ns() - st.st_mtime_ns) < self.racy_seconds * 1e9:
+            self.delete(path, algo)
+            return
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO hash_cache VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    str(path.absolute()),
+                    algo,
+                    st.st_size,
+                    st.st_mtime_ns,
+                    st.st_ino,
+                    digest,
+                ),
+            )
+
+    def delete(self, path: Path, algo: str):
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM hash_cache WHERE path = ? AND algo = ?",
+                (str(path.absolute()), algo),
+            )
+
+    def prune(self) -> int:
+        """
+        Remove the cache of files that no longer exist, return the number of
+        removed paths.
+        """
+        with self._lock:
+            paths = [
+                path
+                for (path,) in self._conn.execute(
+                    "SELECT DISTINCT path FROM hash_cache"
+                )
+                if not os.path.isfile(path)
+            ]
+            self._conn.executemany(
+                "DELETE FROM hash_cache WHERE path = ?",
+                [(path,) for path in paths],
+            )
+            self._conn.commit()
+        return len(paths)
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM hash_cache")
+            self._conn.commit()
+
+    def commit(self):
+        with self._lock:
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.commit()
+            self._conn.close()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM hash_cache").fetchone()[0]
+
+    def __enter__(self) -> "HashCache":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
 
 
 class Hashes:
@@ -46,49 +526,91 @@ class Hashes:
         algo: HashAlgoEnum = HashAlgoEnum.md5,
         hexdigest: bool = True,
     ):
-        self.algo = getattr(hashlib, algo.value)
+        self.algo = _get_constructor(algo)
         self.hexdigest: bool = hexdigest
 
     def use_md5(self) -> "Hashes":
         """
         Use md5 hash algorithm.
         """
-        self.algo = getattr(hashlib, HashAlgoEnum.md5.value)
+        self.algo = _get_constructor(HashAlgoEnum.md5)
         return self
 
     def use_sha1(self) -> "Hashes":
         """
         Use sha1 hash algorithm.
         """
-        self.algo = getattr(hashlib, HashAlgoEnum.sha1.value)
+        self.algo = _get_constructor(HashAlgoEnum.sha1)
         return self
 
     def use_sha224(self) -> "Hashes":
         """
         Use sha224 hash algorithm.
         """
-        self.algo = getattr(hashlib, HashAlgoEnum.sha224.value)
+        self.algo = _get_constructor(HashAlgoEnum.sha224)
         return self
 
     def use_sha256(self) -> "Hashes":
         """
         Use sha256 hash algorithm.
         """
-        self.algo = getattr(hashlib, HashAlgoEnum.sha256.value)
+        self.algo = _get_constructor(HashAlgoEnum.sha256)
         return self
 
     def use_sha384(self) -> "Hashes":
         """
         Use sha384 hash algorithm.
         """
-        self.algo = getattr(hashlib, HashAlgoEnum.sha384.value)
+        self.algo = _get_constructor(HashAlgoEnum.sha384)
         return self
 
     def use_sha512(self) -> "Hashes":
         """
         Use sha512 hash algorithm.
         """
-        self.algo = getattr(hashlib, HashAlgoEnum.sha512.value)
+        self.algo = _get_constructor(HashAlgoEnum.sha512)
+        return self
+
+    def use_blake2b(self) -> "Hashes":
+        """
+        Use blake2b hash algorithm.
+        """
+        self.algo = _get_constructor(HashAlgoEnum.blake2b)
+        return self
+
+    def use_blake2s(self) -> "Hashes":
+        """
+        Use blake2s hash algorithm.
+        """
+        self.algo = _get_constructor(HashAlgoEnum.blake2s)
+        return self
+
+    def use_crc32(self) -> "Hashes":
+        """
+        Use crc32 hash algorithm.
+        """
+        self.algo = _get_constructor(HashAlgoEnum.crc32)
+        return self
+
+    def use_xxh64(self) -> "Hashes":
+        """
+        Use xxh64 hash algorithm, requires ``pip install xxhash``.
+        """
+        self.algo = _get_constructor(HashAlgoEnum.xxh64)
+        return self
+
+    def use_xxh3_64(self) -> "Hashes":
+        """
+        Use xxh3_64 hash algorithm, requires ``pip install xxhash``.
+        """
+        self.algo = _get_constructor(HashAlgoEnum.xxh3_64)
+        return self
+
+    def use_xxh3_128(self) -> "Hashes":
+        """
+        Use xxh3_128 hash algorithm, requires ``pip install xxhash``.
+        """
+        self.algo = _get_constructor(HashAlgoEnum.xxh3_128)
         return self
 
     def use_hexdigesst(self) -> "Hashes":
@@ -109,7 +631,7 @@ class Hashes:
         if algo is None:
             return self.algo()
         else:
-            return getattr(hashlib, algo.value)()
+            return _get_constructor(algo)()
 
     def _digest(self, m, hexdigest: T.Optional[bool]) -> T.Union[str, bytes]:
         if hexdigest is None:
@@ -123,6 +645,18 @@ class Hashes:
             else:
                 return m.digest()
 
+    def _digest_of_bytes(
+        self,
+        digest: bytes,
+        hexdigest: T.Optional[bool],
+    ) -> T.Union[str, bytes]:
+        if hexdigest is None:
+            hexdigest = self.hexdigest
+        if hexdigest:
+            return digest.hex()
+        else:
+            return digest
+
     def of_str(
         self,
         s: str,
@@ -167,104 +701,327 @@ class Hashes:
         self,
         abspath: T.Union[str, Path, T.Any],
         nbytes: int = 0,
-        chunk_size: int = 1024,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
         algo: T.Optional[HashAlgoEnum] = None,
         hexdigest: T.Optional[bool] = None,
+        use_mmap: T.Optional[bool] = False,
+        cache: T.Optional["HashCache"] = None,
     ) -> T.Union[str, bytes]:
         """
         Return hash value of a file, or only a piece of a file
+
+        :param nbytes: only hash the first n bytes, 0 means the entire file.
+        :param chunk_size: read the file by chunks of this size. It doesn't
+            change the hash value.
+        :param use_mmap: hash the memory mapped file in one call, it is the
+            fastest way for large file. If None, use mmap when the file is
+            larger than ``MMAP_THRESHOLD``. It is off by default, because if
+            the file is truncated while it is being hashed (log rotation,
+            file being rewritten, NFS), the process is killed by ``SIGBUS``
+            instead of raising an exception. Only use it for files that are
+            not modified during hashing.
+        :param cache: a :class:`HashCache` object, if given, return the cached
+            hash value if the file is not changed since last time. Only used
+            when hashing the entire file.
+
+        If not using mmap, it reads the file by chunks of ``chunk_size``
+        into a reusable buffer, see :meth:`of_file_object`.
         """
+        if nbytes < 0:
+            raise ValueError("nbytes cannot smaller than 0")
+        if chunk_size < 1:
+            raise ValueError("chunk_size cannot smaller than 1")
         p = Path(abspath)
-        with p.open("rb") as f:
-            return self.of_file_object(
-                f,
-                nbytes=nbytes,
-                chunk_size=chunk_size,
-                algo=algo,
-                hexdigest=hexdigest,
-            )
+        if (cache is None) or nbytes:
+            m = self._construct(algo)
+            _update_from_file(m, p, nbytes, chunk_size, use_mmap)
+            return self._digest(m, hexdigest)
+        res = self._of_file_cached(p, cache, chunk_size, algo, hexdigest, use_mmap)
+        cache.commit()
+        return res
+
+    def _of_file_cached(
+        self,
+        p: Path,
+        cache: "HashCache",
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        algo: T.Optional[HashAlgoEnum] = None,
+        hexdigest: T.Optional[bool] = None,
+        use_mmap: T.Optional[bool] = False,
+    ) -> T.Union[str, bytes]:
+        """
+        Return hash value of the entire file, look up the cache first. The
+        new hash value is not committed to the cache.
+        """
+        m = self._construct(algo)
+        algo_name = getattr(m, "name", type(m).__name__)
+        st = p.stat()
+        digest = cache.get(p, st, algo_name)
+        if (digest is not None) and (not cache.verify):
+            return self._digest_of_bytes(digest, hexdigest)
+        _update_from_file(m, p, 0, chunk_size, use_mmap)
+        if (digest is not None) and (digest != m.digest()):
+            cache.mismatched.append(str(p.absolute()))
+        cache.set(p, st, algo_name, m.digest())
+        return self._digest(m, hexdigest)
+
+    def of_file_multi(
+        self,
+        abspath: T.Union[str, Path, T.Any],
+        algos: T.Iterable[HashAlgoEnum],
+        nbytes: int = 0,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        hexdigest: T.Optional[bool] = None,
+        use_mmap: T.Optional[bool] = False,
+        s3_etag: T.Optional[S3ETag] = None,
+    ) -> T.Dict[str, T.Union[str, bytes]]:
+        """
+        Return hash values of a file with multiple algorithms, the file is
+        read only once.
+
+        Example::
+
+            >>> hashes.of_file_multi(
+            ...     "file.txt",
+            ...     algos=[HashAlgoEnum.md5, HashAlgoEnum.sha256],
+            ...     s3_etag=S3ETag(),
+            ... )
+            {"md5": "...", "sha256": "...", "s3_etag": "...-2"}
+
+        :param algos: the list of hash algorithms, the returned dict uses the
+            value of the algorithm as the key.
+        :param s3_etag: if given, also compute the S3 ETag in the same pass,
+            its hex string is in the ``"s3_etag"`` key.
+        """
+        if nbytes < 0:
+            raise ValueError("nbytes cannot smaller than 0")
+        if chunk_size < 1:
+            raise ValueError("chunk_size cannot smaller than 1")
+        hash_objects = {
+            HashAlgoEnum(algo).value: self._construct(HashAlgoEnum(algo))
+            for algo in algos
+        }
+        m = _MultiHash(list(hash_objects.values()))
+        if s3_etag is not None:
+            m.hash_objects.append(s3_etag)
+        _update_from_file(m, Path(abspath), nbytes, chunk_size, use_mmap)
+        res = {key: self._digest(m, hexdigest) for key, m in hash_objects.items()}
+        if s3_etag is not None:
+            res[s3_etag.name] = s3_etag.hexdigest()
+        return res
+
+    def of_s3_etag(
+        self,
+        abspath: T.Union[str, Path, T.Any],
+        part_size: int = 8 * 1024 * 1024,
+        multipart_threshold: int = 8 * 1024 * 1024,
+    ) -> str:
+        """
+        Return the S3 ETag of a file if it is uploaded with the given
+        ``part_size`` and ``multipart_threshold``, see :class:`S3ETag`.
+        """
+        m = S3ETag(part_size=part_size, multipart_threshold=multipart_threshold)
+        _update_from_file(m, Path(abspath))
+        return m.hexdigest()
 
     def of_file_object(
         self,
         f,
         nbytes: int = 0,
-        chunk_size: int = 4096,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
         algo: T.Optional[HashAlgoEnum] = None,
         hexdigest: T.Optional[bool] = None,
     ) -> T.Union[str, bytes]:
+        """
+        Return hash value of a binary file object, from the current position.
+
+        If the file object has ``readinto`` method, it reads data into a
+        preallocated buffer, so no new ``bytes`` is created for each chunk.
+        """
         if nbytes < 0:
-            raise ValueError("chunk_size cannot smaller than 0")
+            raise ValueError("nbytes cannot smaller than 0")
         if chunk_size < 1:
             raise ValueError("chunk_size cannot smaller than 1")
-        if (nbytes > 0) and (nbytes < chunk_size):
-            chunk_size = nbytes
-
         m = self._construct(algo)
+        _update_from_file_object(m, f, nbytes, chunk_size)
+        return self._digest(m, hexdigest)
 
-        if nbytes:  # use first n bytes only
-            have_reads = 0
-            while True:
-                have_reads += chunk_size
-                if have_reads > nbytes:
-                    n = nbytes - (have_reads - chunk_size)
-                    if n:
-                        data = f.read(n)
-                        m.update(data)
-                    break
-                else:
-                    data = f.read(chunk_size)
-                    m.update(data)
-        else:  # use entire content
-            while True:
-                data = f.read(chunk_size)
-                if not data:
-                    break
-                m.update(data)
+    def of_iterable(
+        self,
+        chunks: T.Iterable[T.Union[bytes, bytearray, memoryview]],
+        algo: T.Optional[HashAlgoEnum] = None,
+        hexdigest: T.Optional[bool] = None,
+    ) -> T.Union[str, bytes]:
+        """
+        Return hash value of the concatenation of an iterable of bytes, for
+        example, the ``iter_chunks()`` of a http response body.
+        """
+        m = self._construct(algo)
+        for chunk in chunks:
+            m.update(chunk)
         return self._digest(m, hexdigest)
 
+    def reader(
+        self,
+        f,
+        algo: T.Optional[HashAlgoEnum] = None,
+    ) -> HashingReader:
+        """
+        Wrap a binary file object, it computes the hash value while the data
+        is read through it. See :class:`HashingReader`.
+        """
+        return HashingReader(f, self._construct(algo))
+
+    def writer(
+        self,
+        f,
+        algo: T.Optional[HashAlgoEnum] = None,
+    ) -> HashingWriter:
+        """
+        Wrap a binary file object, it computes the hash value while the data
+        is written through it. See :class:`HashingWriter`.
+        """
+        return HashingWriter(f, self._construct(algo))
+
+    def _of_files(
+        self,
+        paths: T.List[Path],
+        algo: T.Optional[HashAlgoEnum] = None,
+        hexdigest: T.Optional[bool] = None,
+        max_workers: int = 1,
+        cache: T.Optional["HashCache"] = None,
+    ) -> T.List[T.Union[str, bytes]]:
+        """
+        Return hash values of a list of files, in the same order. If
+        ``max_workers`` is greater than 1, hash files concurrently in a thread
+        pool, hashlib releases the GIL when hashing large buffer.
+        """
+        if max_workers < 1:
+            raise ValueError("max_workers cannot smaller than 1")
+        if cache is None:
+            func = lambda p: self.of_file(p, algo=algo, hexdigest=hexdigest)
+        else:
+            func = lambda p: self._of_file_cached(
+                p, cache, algo=algo, hexdigest=hexdigest
+            )
+        if (max_workers == 1) or (len(paths) <= 1):
+            return [func(p) for p in paths]
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as pool:
+            return list(pool.map(func, paths))
+
     def of_folder(
         self,
         abspath: T.Union[str, Path, T.Any],
         algo: T.Optional[HashAlgoEnum] = None,
         hexdigest: T.Optional[bool] = None,
+        max_workers: int = 1,
+        cache: T.Optional["HashCache"] = None,
     ) -> str:
         """
         Return hash value of a folder. It is based on the concatenation of
         the hash values of all files in the folder. The order of the files
         are sorted by their paths.
+
+        :param max_workers: if greater than 1, hash files concurrently in a
+            thread pool. The result is the same as the serial one.
+        :param cache: a :class:`HashCache` object, only re-hash changed files.
         """
         path = Path(abspath)
         if not path.is_dir():
             raise NotADirectoryError(f"{path} is not a folder!")
-        hashes = list()
-        for p in sorted(path.glob("**/*"), key=lambda x: str(x)):
-            if p.is_file():
-                hashes.append(self.of_file(p, algo=algo, hexdigest=hexdigest))
+        files = [
+            p for p in sorted(path.glob("**/*"), key=lambda x: str(x)) if p.is_file()
+        ]
+        hashes = self._of_files(
+            files,
+            algo=algo,
+            hexdigest=hexdigest,
+            max_workers=max_workers,
+            cache=cache,
+        )
+        if cache is not None:
+            cache.commit()
         return self.of_str(
             s="".join(hashes),
             algo=algo,
             hexdigest=hexdigest,
         )
 
+    def of_folder_merkle(
+        self,
+        abspath: T.Union[str, Path, T.Any],
+        algo: T.Optional[HashAlgoEnum] = None,
+        hexdigest: T.Optional[bool] = None,
+        max_workers: int = 1,
+        cache: T.Optional["HashCache"] = None,
+    ) -> "MerkleTree":
+        """
+        Return the :class:`MerkleTree` of a folder. Unlike :meth:`of_folder`,
+        the relative paths of the files are part of the hash, every sub
+        folder has its own hash, and it can be updated incrementally.
+
+        :param max_workers: if greater than 1, hash files concurrently in a
+            thread pool.
+        :param cache: a :class:`HashCache` object, only re-hash changed files.
+        """
+        return MerkleTree(
+            hashes=self,
+            root=abspath,
+            algo=algo,
+            hexdigest=hexdigest,
+            max_workers=max_workers,
+            cache=cache,
+        ).build()
+
     def of_paths(
         self,
         paths: T.List[T.Union[str, Path, T.Any]],
         algo: T.Optional[HashAlgoEnum] = None,
         hexdigest: T.Optional[bool] = None,
+        max_workers: int = 1,
+        cache: T.Optional["HashCache"] = None,
     ) -> str:
         """
         Return hash value of a list of paths. It is based on the concatenation of
         the hash values of all files and folders.
+
+        :param max_workers: if greater than 1, hash files concurrently in a
+            thread pool, both the files in the list and the files in the
+            folders. The result is the same as the serial one.
+        :param cache: a :class:`HashCache` object, only re-hash changed files.
         """
         hashes = list()
+        files = list()  # the files in the list, hashed in one batch
+        file_indexes = list()  # the position of these files in ``hashes``
         for path in paths:
             path = Path(path)
             if path.is_dir():
-                hashes.append(self.of_folder(path, algo=algo, hexdigest=hexdigest))
+                hashes.append(
+                    self.of_folder(
+                        path,
+                        algo=algo,
+                        hexdigest=hexdigest,
+                        max_workers=max_workers,
+                        cache=cache,
+                    )
+                )
             elif path.is_file():
-                hashes.append(self.of_file(path, algo=algo, hexdigest=hexdigest))
+                file_indexes.append(len(hashes))
+                files.append(path)
+                hashes.append(None)
             else:  # pragma: no cover
                 pass
+        file_hashes = self._of_files(
+            files,
+            algo=algo,
+            hexdigest=hexdigest,
+            max_workers=max_workers,
+            cache=cache,
+        )
+        for ind, hash_value in zip(file_indexes, file_hashes):
+            hashes[ind] = hash_value
+        if cache is not None:
+            cache.commit()
         return self.of_str(
             s="".join(hashes),
             algo=algo,
@@ -272,4 +1029,248 @@ class Hashes:
         )
 
 
+class MerkleTree:
+    """
+    The Merkle tree of a folder. The hash of a file node is the hash of
+    its content, the hash of a folder node is the hash of the names, types
+    and hashes of its children, so it also changes when a file is renamed
+    or moved. The root hash changes if anything in the folder changes.
+
+    It keeps the hash of every node in memory, so :meth:`update` only
+    re-hashes the changed files and the folders from them up to the root.
+
+    Use :meth:`Hashes.of_folder_merkle` to create it. All paths in the API
+    can be absolute, or relative to the root folder. Relative paths in the
+    result use ``/`` as separator, and the root folder is ``""``.
+
+    **中文文档**
+
+    文件夹的 Merkle 树. 文件节点的哈希是文件内容的哈希, 文件夹节点的哈希是所有子节点的
+    名字, 类型和哈希的哈希, 所以文件重命名或移动也会改变哈希. 由于保存了所有节点的哈希,
+    :meth:`update` 只需要重新计算变化了的文件, 以及从这些文件到根节点路径上的文件夹.
+    """
+
+    def __init__(
+        self,
+        hashes: "Hashes",
+        root: T.Union[str, Path, T.Any],
+        algo: T.Optional[HashAlgoEnum] = None,
+        hexdigest: T.Optional[bool] = None,
+        max_workers: int = 1,
+        cache: T.Optional[HashCache] = None,
+    ):
+        self.hashes = hashes
+        self.root = Path(root).absolute()
+        self.algo = algo
+        self.hexdigest = hexdigest
+        self.max_workers = max_workers
+        self.cache = cache
+        self._files: T.Dict[str, bytes] = dict()
+        self._dirs: T.Dict[str, bytes] = dict()
+        self._children: T.Dict[str, T.Set[str]] = dict()
+
+    def _rel(self, path: T.Union[str, Path, T.Any]) -> str:
+        path = Path(path)
+        if path.is_absolute():
+            path = path.relative_to(self.root)
+        rel = path.as_posix()
+        if rel == ".":
+            return ""
+        return rel
+
+    @staticmethod
+    def _join(rel: str, name: str) -> str:
+        if rel:
+            return f"{rel}/{name}"
+        return name
+
+    @staticmethod
+    def _depth(rel: str) -> int:
+        if rel:
+            return rel.count("/") + 1
+        return 0
+
+    def _hash_files(self, rels: T.List[str]):
+        digests = self.hashes._of_files(
+            [self.root.joinpath(rel) for rel in rels],
+            algo=self.algo,
+            hexdigest=False,
+            max_workers=self.max_workers,
+            cache=self.cache,
+        )
+        if self.cache is not None:
+            self.cache.commit()
+        self._files.update(zip(rels, digests))
+
+    def _scan(self, rel: str) -> T.List[str]:
+        """
+        Add the folder ``rel`` and everything in it, return the new folders.
+        """
+        files = list()
+        dirs = list()
+        for dirpath, dirnames, filenames in os.walk(self.root.joinpath(rel)):
+            dir_rel = self._rel(dirpath)
+            dirs.append(dir_rel)
+            # os.walk doesn't go into symlink folders, skip them
+            dirnames[:] = [
+                d for d in dirnames if not os.path.islink(os.path.join(dirpath, d))
+            ]
+            children = set(dirnames)
+            for filename in filenames:
+                if os.path.isfile(os.path.join(dirpath, filename)):
+                    files.append(self._join(dir_rel, filename))
+                    children.add(filename)
+            self._children[dir_rel] = children
+        self._hash_files(files)
+        return dirs
+
+    def _attach(self, rel: str):
+        """
+        Add ``rel`` to its parent folder, create the parent if not exists.
+        """
+        while rel:
+            parent, _, name = rel.rpartition("/")
+            if parent in self._children:
+                self._children[parent].add(name)
+                return
+            self._children[parent] = {name}
+            rel = parent
+
+    def _detach(self, rel: str):
+        """
+        Remove ``rel`` and everything in it from the tree.
+        """
+        if rel in self._files:
+            del self._files[rel]
+        elif rel in self._children:
+            prefix = self._join(rel, "")
+            for nodes in [self._files, self._dirs, self._children]:
+                for key in [k for k in nodes if k.startswith(prefix)]:
+                    del nodes[key]
+            del self._children[rel]
+            self._dirs.pop(rel, None)
+        else:
+            return
+        parent, _, name = rel.rpartition("/")
+        if parent in self._children:
+            self._children[parent].discard(name)
+
+    def _compute_dirs(self, rels: T.Iterable[str]):
+        """
+        Compute the hash of the given folders, children first.
+        """
+        for rel in sorted(set(rels), key=self._depth, reverse=True):
+            if rel not in self._children:  # removed
+                continue
+            m = self.hashes._construct(self.algo)
+            for name in sorted(self._children[rel]):
+                child = self._join(rel, name)
+                if child in self._files:
+                    m.update(b"f" + name.encode("utf-8") + b"\0" + self._files[child])
+                else:
+                    m.update(b"d" + name.encode("utf-8") + b"\0" + self._dirs[child])
+            self._dirs[rel] = m.digest()
+
+    def build(self) -> "MerkleTree":
+        """
+        Hash everything in the root folder.
+        """
+        if not self.root.is_dir():
+            raise NotADirectoryError(f"{self.root} is not a folder!")
+        self._files.clear()
+        self._dirs.clear()
+        self._children.clear()
+        self._compute_dirs(self._scan(""))
+        return self
+
+    def update(
+        self,
+        paths: T.Iterable[T.Union[str, Path, T.Any]],
+    ) -> T.List[str]:
+        """
+        Update the tree after the given files or folders are created, modified
+        or deleted. Only these paths and their parent folders are re-hashed.
+
+        :return: the relative path of the re-computed folders, the deepest first.
+        """
+        dirty = set()
+        new_files = list()
+        for path in paths:
+            rel = self._rel(path)
+            if rel == "":
+                self.build()
+                return sorted(self._dirs, key=self._depth, reverse=True)
+            abspath = self.root.joinpath(rel)
+            if abspath.is_file():
+                if rel not in self._files:
+                    self._detach(rel)
+                    self._attach(rel)
+                new_files.append(rel)
+            elif abspath.is_dir():
+                self._detach(rel)
+                self._attach(rel)
+                dirty.update(self._scan(rel))
+            else:  # deleted, also remove the deleted parent folders
+                self._detach(rel)
+                parent = rel.rpartition("/")[0]
+                while parent and (not self.root.joinpath(parent).is_dir()):
+                    self._detach(parent)
+                    rel, parent = parent, parent.rpartition("/")[0]
+            parent = rel
+            while parent:
+                parent = parent.rpartition("/")[0]
+                dirty.add(parent)
+        self._hash_files(new_files)
+        self._compute_dirs(dirty)
+        return sorted(
+            [rel for rel in dirty if rel in self._dirs], key=self._depth, reverse=True
+        )
+
+    def _format(self, digest: bytes) -> T.Union[str, bytes]:
+        return self.hashes._digest_of_bytes(digest, self.hexdigest)
+
+    @property
+    def root_hash(self) -> T.Union[str, bytes]:
+        return self._format(self._dirs[""])
+
+    def hash_of(self, path: T.Union[str, Path, T.Any]) -> T.Union[str, bytes]:
+        """
+        Return the hash of a file or folder node.
+        """
+        rel = self._rel(path)
+        if rel in self._files:
+            return self._format(self._files[rel])
+        return self._format(self._dirs[rel])
+
+    @property
+    def file_hashes(self) -> T.Dict[str, T.Union[str, bytes]]:
+        return {rel: self._format(digest) for rel, digest in self._files.items()}
+
+    @property
+    def dir_hashes(self) -> T.Dict[str, T.Union[str, bytes]]:
+        return {rel: self._format(digest) for rel, digest in self._dirs.items()}
+
+    def diff(self, other: "MerkleTree") -> T.List[str]:
+        """
+        Return the sorted relative paths of the nodes that are different or
+        only exist in one of the two trees. Unchanged sub folders are skipped
+        without comparing their children.
+        """
+        res = list()
+        stack = [""]
+        while stack:
+            rel = stack.pop()
+            if self._dirs.get(rel) == other._dirs.get(rel):
+                continue
+            res.append(rel)
+            names = self._children.get(rel, set()) | other._children.get(rel, set())
+            for name in sorted(names, reverse=True):
+                child = self._join(rel, name)
+                if (child in self._children) or (child in other._children):
+                    stack.append(child)
+                elif self._files.get(child) != other._files.get(child):
+                    res.append(child)
+        return sorted(res)
+
+
 hashes = Hashes()
@@ -5,11 +5,53 @@ This module provides plenty of useful functions for iterable object manipulation
 """
 
 import typing as T
+import os
+import sys
+import enum
 import random
 import collections
+import collections.abc
 import itertools
+import operator
+import math
+import functools
+import copy
+import heapq
+import pickle
+import tempfile
+import concurrent.futures
+
+__version__ = "0.2.1"
+
+_NOTHING = object()
+
+KT = T.TypeVar("KT")
+VT = T.TypeVar("VT")
+
+
+def _as_ndarray(obj):
+    """
+    Return ``obj`` if it is a ``numpy.ndarray``, otherwise return None. It is
+    used to auto select the vectorized backend of the window, shift and
+    difference functions.
+
+    Only an input that is already a numpy array uses the numpy backend, any
+    other input (including ``array.array``) uses the pure Python one, so the
+    type of the result doesn't depend on whether numpy is installed. numpy is
+    an optional dependency, it is never imported by this module.
+
+    **中文文档**
+
+    如果输入是 numpy 数组, 则返回它本身, 否则返回 None. 用于自动选择向量化的计算后端.
+    只有输入本身是 numpy 数组时才使用 numpy, 其他输入 (包括 ``array.array``) 都使用
+    纯 Python 实现, 这样返回值的类型不会因为是否安装了 numpy 而不同.
+    """
+    # if obj is a numpy array, numpy is already imported
+    np = sys.modules.get("numpy")
+    if np is not None and isinstance(obj, np.ndarray):
+        return obj
+    return None
 
-__version__ = "0.1.1"
 
 def flatten(iterable: T.Iterable) -> T.Iterable:
     """
@@ -30,28 +72,66 @@ def flatten(iterable: T.Iterable) -> T.Iterable:
     return itertools.chain.from_iterable(iterable)
 
 
-def flatten_all(nested_iterable: T.Iterable) -> T.Iterable:
+DEFAULT_ATOMIC_TYPES = (str, bytes, bytearray)
+
+
+def flatten_all(
+    nested_iterable: T.Iterable,
+    atomic_types: T.Tuple[T.Type, ...] = DEFAULT_ATOMIC_TYPES,
+    max_depth: T.Optional[int] = None,
+) -> T.Iterable:
     """Flatten arbitrary depth of nesting. Good for unknown nesting structure
     iterable object.
 
+    :param nested_iterable: the nested iterable object.
+    :param atomic_types: iterable types that should not be flattened, by
+        default ``str``, ``bytes`` and ``bytearray``. For example, you can use
+        ``(str, bytes, dict)`` to keep dict as a leaf. ``str`` is always a
+        leaf even if it is not in ``atomic_types``, because iterating a
+        one character string yields itself forever.
+    :param max_depth: flatten at most ``max_depth`` levels of nesting below
+        the top level, deeper iterables are yielded as they are.
+        None means no limit.
+
     Example::
 
         >>> list(flatten_all([[1, 2], "abc", [3, ["x", "y", "z"]], 4]))
         [1, 2, "abc", 3, "x", "y", "z", 4]
 
+        >>> list(flatten_all([[1, 2], "abc", [3, ["x", "y", "z"]], 4], max_depth=1))
+        [1, 2, "abc", 3, ["x", "y", "z"], 4]
+
     **中文文档**
 
     将任意维度的列表压平成一维列表.
 
+    使用一个显式的栈来代替递归, 所以每个元素的开销是 O(1), 与嵌套深度无关,
+    并且不会因为嵌套过深而抛出 ``RecursionError``.
+
     注: 使用 ``hasattr(i, "__iter__")`` 方法做是否是可循环对象的判断, 性能要高于其他
     任何方法, 例如: ``isinstance(i, collections.Iterable)``.
     """
-    for item in nested_iterable:
-        if hasattr(item, "__iter__") and not isinstance(item, str):
-            for i in flatten_all(item):
-                yield i
+    if max_depth is None:
+        max_depth = -1  # never equals to len(stack) - 1
+    elif max_depth < 0:
+        raise ValueError("max_depth has to be greater or equal than zero!")
+    atomic_types = tuple(atomic_types)
+    if not issubclass(str, atomic_types):
+        atomic_types = atomic_types + (str,)
+    stack = [iter(nested_iterable)]
+    while stack:
+        for item in stack[-1]:
+            if (
+                hasattr(item, "__iter__")
+                and (not isinstance(item, atomic_types))
+                and (len(stack) != max_depth + 1)
+            ):
+                stack.append(iter(item))
+                break
+            else:
+                yield item
         else:
-            yield item
+            stack.pop()
 
 
 def nth(iterable: T.Iterable, n: int, default=None):
@@ -113,9 +193,23 @@ def pull(iterable: T.Iterable, n: int) -> list:
     return list(fifo)
 
 
-def shuffled(lst: list) -> list:
+def _get_random(seed: T.Optional[T.Union[int, random.Random]] = None):
+    if isinstance(seed, random.Random):
+        return seed
+    if seed is None:  # module level functions use the global generator
+        return random
+    return random.Random(seed)
+
+
+def shuffled(
+    lst: list,
+    seed: T.Optional[T.Union[int, random.Random]] = None,
+) -> list:
     """Returns the shuffled iterable.
 
+    :param seed: an int seed or a ``random.Random`` object for reproducible
+        result, default is the global random generator.
+
     Example::
 
         >>> shuffled([0, 1, 2])
@@ -125,7 +219,182 @@ def shuffled(lst: list) -> list:
 
     打乱一个可循环对象中所有元素的顺序. 并打包成列表返回.
     """
-    return random.sample(lst, len(lst))
+    return _get_random(seed).sample(lst, len(lst))
+
+
+def _random_open(rng: random.Random) -> float:
+    """
+    Return a random float in the open interval (0, 1).
+    """
+    while True:
+        r = rng.random()
+        if r:
+            return r
+
+
+def reservoir_sample(
+    iterable: T.Iterable,
+    k: int,
+    seed: T.Optional[T.Union[int, random.Random]] = None,
+    skip_ahead: bool = True,
+) -> list:
+    """
+    Randomly sample k items from an iterable of unknown length in a single
+    pass, using O(k) memory. If there are fewer than k items, all items are
+    returned.
+
+    :param seed: an int seed or a ``random.Random`` object for reproducible
+        result, default is the global random generator.
+    :param skip_ahead: if True, use the Algorithm L, it computes how many
+        items to skip before the next replacement, so it only generates
+        O(k * log(n / k)) random numbers. If False, use the Algorithm R, it
+        generates one random number per item.
+
+    Example::
+
+        >>> reservoir_sample(range(1000000), k=3, seed=1)
+        [...]
+
+    **中文文档**
+
+    蓄水池抽样. 从长度未知的可循环对象中单次遍历均匀随机抽取 k 个元素, 内存占用为
+    O(k). ``skip_ahead=True`` 时使用 Algorithm L, 直接计算下一次替换前需要跳过的
+    元素个数, 随机数的生成次数远少于 Algorithm R.
+
+    Ref: https://en.wikipedia.org/wiki/Reservoir_sampling
+    """
+    if k < 0:
+        raise ValueError("k has to be greater or equal than zero!")
+    rng = _get_random(seed)
+    iterator = iter(iterable)
+    reservoir = list(itertools.islice(iterator, k))
+    if len(reservoir) < k or k == 0:
+        return reservoir
+
+    if skip_ahead:  # Algorithm L
+        w = math.exp(math.log(_random_open(rng)) / k)
+        while True:
+            # log1p(-w) keeps the precision when w is tiny, log(1 - w) would
+            # round to log(1.0) == 0
+            denominator = math.log1p(-w)
+            if denominator < 0.0:
+                skip = min(math.log(_random_open(rng)) / denominator, sys.maxsize)
+            else:  # w underflows to 0, no more item would be selected
+                skip = sys.maxsize
+            item = nth(iterator, int(skip), _NOTHING)
+            if item is _NOTHING:
+                break
+            reservoir[rng.randrange(k)] = item
+            w *= math.exp(math.log(_random_open(rng)) / k)
+    else:  # Algorithm R
+        for i, item in enumerate(iterator, start=k + 1):
+            j = rng.randrange(i)
+            if j < k:
+                reservoir[j] = item
+    return reservoir
+
+
+def weighted_reservoir_sample(
+    iterable: T.Iterable[VT],
+    k: int,
+    get_weight: T.Callable[[VT], float],
+    seed: T.Optional[T.Union[int, random.Random]] = None,
+) -> T.List[VT]:
+    """
+    Randomly sample k items without replacement from an iterable of unknown
+    length in a single pass, the probability of an item to be selected is
+    proportional to its weight. Items with non-positive weight are never
+    selected. It uses the Algorithm A-Res with O(k) memory.
+
+    Example::
+
+        >>> weighted_reservoir_sample(
+        ...     [("a", 1), ("b", 100)], k=1, get_weight=lambda x: x[1]
+        ... )
+        [("b", 100)]  # most likely
+
+    **中文文档**
+
+    加权蓄水池抽样 (A-Res 算法). 每个元素被选中的概率与其权重成正比, 权重小于等于 0
+    的元素不会被选中. 内存占用为 O(k).
+    """
+    if k < 0:
+        raise ValueError("k has to be greater or equal than zero!")
+    if k == 0:
+        return []
+    rng = _get_random(seed)
+    # the key of A-Res is u ** (1 / w), we use log(u) / w to avoid underflow
+    heap = list()
+    counter = itertools.count()
+    for item in iterable:
+        weight = get_weight(item)
+        if weight <= 0:
+            continue
+        entry = (math.log(_random_open(rng)) / weight, next(counter), item)
+        if len(heap) < k:
+            heapq.heappush(heap, entry)
+        elif heap[0] < entry:
+            heapq.heapreplace(heap, entry)
+    return [entry[2] for entry in sorted(heap, reverse=True)]
+
+
+def external_shuffle(
+    iterable: T.Iterable[VT],
+    max_items_in_memory: int = 1000000,
+    seed: T.Optional[T.Union[int, random.Random]] = None,
+    dir: T.Optional[str] = None,
+) -> T.Iterable[VT]:
+    """
+    Shuffle an iterable that is larger than memory. The items have to be
+    picklable.
+
+    Items are buffered in memory, once the buffer has ``max_items_in_memory``
+    items, it is shuffled and spilled to a temp file. At the end, it
+    repeatedly picks a random file with probability proportional to its
+    number of remaining items and yields its next item, which results in a
+    uniformly random permutation.
+
+    :param seed: an int seed or a ``random.Random`` object for reproducible
+        result, default is the global random generator.
+    :param dir: the directory for the temp files, default is the system
+        temp directory.
+
+    **中文文档**
+
+    对大于内存的数据进行随机打乱. 数据会被分块打乱后写入临时文件, 最后按照每个
+    文件中剩余的元素个数为权重随机选择文件, 并输出其下一个元素, 这样得到的排列是
+    均匀随机的.
+    """
+    if max_items_in_memory < 1:
+        raise ValueError("max_items_in_memory has to be greater than zero!")
+    rng = _get_random(seed)
+    files = list()
+    try:
+        runs = list()
+        remains = list()
+        for chunk in grouper_list(iterable, max_items_in_memory):
+            rng.shuffle(chunk)
+            if len(chunk) == max_items_in_memory:
+                f = _dump_run(chunk, dir)
+                files.append(f)
+                runs.append(_load_run(f))
+            else:  # the last chunk stays in memory
+                runs.append(iter(chunk))
+            remains.append(len(chunk))
+
+        total = sum(remains)
+        while total:
+            r = rng.randrange(total)
+            for i, remain in enumerate(remains):
+                if r < remain:
+                    break
+                r -= remain
+            remains[i] -= 1
+            total -= 1
+            yield next(runs[i])
+    finally:
+        for f in files:
+            f.close()
 
 
 def grouper(iterable: T.Iterable, n: int, fillvalue=None):
@@ -205,11 +474,190 @@ def grouper_dict(dct: dict, n: int, dict_type=dict) -> T.Iterable[dict]:
         yield chunk
 
 
+class ExecutorEnum(str, enum.Enum):
+    thread = "thread"
+    process = "process"
+
+
+def parallel_map_batches(
+    iterable: T.Iterable,
+    n: int,
+    func: T.Callable,
+    executor: T.Union[
+        str, ExecutorEnum, concurrent.futures.Executor
+    ] = ExecutorEnum.thread,
+    max_workers: T.Optional[int] = None,
+    max_in_flight: T.Optional[int] = None,
+    ordered: bool = True,
+) -> T.Iterable:
+    """
+    Chunk the iterable into n-size batches by :func:`grouper_list`
+    (or :func:`grouper_dict` if it is a dict), call ``func(batch)`` in a
+    thread / process pool, and yield the return values.
+
+    At most ``max_in_flight`` batches are submitted but not yet consumed,
+    so the iterable is consumed lazily and never fully loaded in memory.
+
+    :param iterable: any iterable object, or a dict.
+    :param n: batch size.
+    :param func: the function to apply on each batch. It has to be picklable
+        if you use the process executor.
+    :param executor: "thread", "process", or an existing
+        ``concurrent.futures.Executor`` object. The pool created by this
+        function is shut down when the generator is exhausted or closed.
+    :param max_workers: number of workers of the created pool.
+    :param max_in_flight: max number of pending batches,
+        default is two times of the number of workers.
+    :param ordered: if True, yield results in the order of the batches,
+        otherwise yield results as they complete.
+
+    Example::
+
+        >>> list(parallel_map_batches(range(10), n=3, func=sum))
+        [3, 12, 21, 9]
+
+    **中文文档**
+
+    将可循环对象用 :func:`grouper_list` (字典则用 :func:`grouper_dict`) 分批,
+    然后在线程池或进程池中并行处理每一批数据, 并返回结果. 最多只会有
+    ``max_in_flight`` 个批次处于已提交但结果还未被消费的状态, 以此实现背压,
+    保证大数据不会被一次性读入内存. ``ordered=True`` 时按批次顺序返回结果,
+    否则按完成顺序返回.
+    """
+    if max_in_flight is None:
+        max_in_flight = 2 * (max_workers or os.cpu_count() or 1)
+    if max_in_flight < 1:
+        raise ValueError("max_in_flight has to be greater than zero!")
+
+    if isinstance(executor, concurrent.futures.Executor):
+        pool = executor
+        owns_pool = False
+    else:
+        executor = ExecutorEnum(executor)
+        if executor is ExecutorEnum.thread:
+            pool = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers)
+        else:
+            pool = concurrent.futures.ProcessPoolExecutor(max_workers=max_workers)
+        owns_pool = True
+
+    if isinstance(iterable, dict):
+        batches = grouper_dict(iterable, n)
+    else:
+        batches = grouper_list(iterable, n)
+
+    if ordered:
+        pending = collections.deque()
+    else:
+        pending = set()
+    try:
+        for batch in batches:
+            if len(pending) >= max_in_flight:
+                if ordered:
+                    yield pending.popleft().result()
+                else:
+                    done, pending = concurrent.futures.wait(
+                        pending,
+                        return_when=concurrent.futures.FIRST_COMPLETED,
+                    )
+                    for future in done:
+                        yield future.result()
+            future = pool.submit(func, batch)
+            if ordered:
+                pending.append(future)
+            else:
+                pending.add(future)
+
+        if ordered:
+            while pending:
+                yield pending.popleft().result()
+        else:
+            for future in concurrent.futures.as_completed(pending):
+                yield future.result()
+            pending = set()
+    finally:
+        for future in pending:
+            future.cancel()
+        if owns_pool:
+            pool.shutdown(wait=True)
+
+
 # --- Window ---
-def running_window(lst: list, size: int):
+class WindowView(collections.abc.Sequence):
+    """
+    A lightweight read-only view of ``size`` consecutive items of ``data``
+    starting at ``start``. The index wraps around the end of ``data``, so it
+    can also represent a cyclic window. No item is copied.
+
+    Example::
+
+        >>> view = WindowView([1, 2, 3, 4, 5], start=3, size=3)
+        >>> list(view)
+        [4, 5, 1]
+
+    **中文文档**
+
+    一个轻量级的只读窗口视图, 不会复制原始数据. 索引超出 ``data`` 末尾时会从头
+    循环, 所以也可以用于表示循环窗口.
+    """
+
+    __slots__ = ("_data", "_start", "_size", "_length")
+
+    def __init__(self, data: T.Sequence, start: int, size: int):
+        self._data = data
+        self._start = start
+        self._size = size
+        self._length = len(data)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._size))]
+        if index < 0:
+            index += self._size
+        if not (0 <= index < self._size):
+            raise IndexError("window index out of range")
+        return self._data[(self._start + index) % self._length]
+
+    def __iter__(self):
+        getter = self._data.__getitem__
+        end = self._start + self._size
+        if end <= self._length:
+            return map(getter, range(self._start, end))
+        return itertools.chain(
+            map(getter, range(self._start, self._length)),
+            map(getter, range(0, end - self._length)),
+        )
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, (list, tuple, WindowView)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({list(self)!r})"
+
+    def to_list(self) -> list:
+        """
+        Copy the items in this window to a new list.
+        """
+        return list(self)
+
+
+def running_window(lst: T.Iterable, size: int, copy: bool = True):
     """
     Generate n-size running window.
 
+    :param lst: any iterable object, it can be an unbounded generator.
+    :param size: the window size.
+    :param copy: if True, each window is a new list. If False, each window
+        is a read-only :class:`WindowView`. For a sequence input (list, tuple,
+        ...) the view points to the original data and it is valid forever.
+        For other iterables the view points to an internal ring buffer of
+        ``size`` items, it is **only valid until the next window is generated**,
+        call ``view.to_list()`` if you need to keep it.
+
     Example::
 
         >>> for i in running_window([1, 2, 3, 4, 5], size=3):
@@ -218,24 +666,76 @@ def running_window(lst: list, size: int):
         [2, 3, 4]
         [3, 4, 5]
 
+        >>> for i in running_window(iter([1, 2, 3, 4, 5]), size=3, copy=False):
+        ...     print(i)
+        WindowView([1, 2, 3])
+        WindowView([2, 3, 4])
+        WindowView([3, 4, 5])
+
+    If ``lst`` is a ``numpy.ndarray``, it returns a 2D read-only numpy
+    strided view (no data is copied), each row is a window. The ``copy``
+    parameter is ignored in this case. Any other input, including
+    ``array.array``, generates lists or :class:`WindowView` as above.
+
     **中文文档**
 
-    简单滑窗函数.
-    """
-    if size > len(lst):
-        raise ValueError("size can not be greater than length of iterable.")
+    简单滑窗函数. 可以接受任意可循环对象, 包括无限长的生成器.
 
-    fifo = collections.deque(maxlen=size)
-    for i in lst:
-        fifo.append(i)
-        if len(fifo) == size:
-            yield list(fifo)
+    当 ``copy=False`` 时, 每个窗口是一个只读的 :class:`WindowView`, 不会为每个窗口
+    创建新的列表. 对于 list, tuple 等序列, 视图直接指向原始数据. 对于其他可循环
+    对象, 视图指向内部一个长度为 ``size`` 的环形缓冲区, 只在生成下一个窗口之前有效,
+    内存占用为 O(size).
 
+    如果输入是 numpy 数组, 则返回一个零拷贝的二维 numpy 视图, 每一行是一个窗口,
+    此时 ``copy`` 参数无效. 其他输入 (包括 ``array.array``) 不使用 numpy.
+    """
+    if size < 1:
+        raise ValueError("size has to be greater than zero!")
+    if hasattr(lst, "__len__") and size > len(lst):
+        raise ValueError("size can not be greater than length of iterable.")
 
-def cycle_running_window(lst: list, size: int) -> list:
+    arr = _as_ndarray(lst)
+    if arr is not None:
+        from numpy.lib.stride_tricks import sliding_window_view
+
+        return sliding_window_view(arr, size)
+    if (copy is False) and isinstance(lst, collections.abc.Sequence):
+        return (WindowView(lst, i, size) for i in range(len(lst) - size + 1))
+    return _running_window(lst, size, copy)
+
+
+def _running_window(iterable: T.Iterable, size: int, copy: bool = True):
+    if copy:
+        fifo = collections.deque(maxlen=size)
+        for i in iterable:
+            fifo.append(i)
+            if len(fifo) == size:
+                yield list(fifo)
+        if len(fifo) < size:
+            raise ValueError("size can not be greater than length of iterable.")
+    else:
+        iterator = iter(iterable)
+        buffer = list(itertools.islice(iterator, size))
+        if len(buffer) < size:
+            raise ValueError("size can not be greater than length of iterable.")
+        start = 0
+        yield WindowView(buffer, start, size)
+        for i in iterator:
+            # overwrite the oldest item, the next one becomes the oldest
+            buffer[start] = i
+            start = (start + 1) % size
+            yield WindowView(buffer, start, size)
+
+
+def cycle_running_window(lst: list, size: int, copy: bool = True):
     """
     Generate n-size cycle running window.
 
+    :param lst: a list like object that support ``len()``.
+    :param size: the window size.
+    :param copy: if True, each window is a new list. If False, each window
+        is a read-only :class:`WindowView` of the original data.
+
     Example::
 
         >>> for i in cycle_running_window([1, 2, 3, 4, 5], size=3):
@@ -246,13 +746,36 @@ def cycle_running_window(lst: list, size: int) -> list:
         [4, 5, 1]
         [5, 1, 2]
 
+    If ``lst`` is a ``numpy.ndarray``, it returns a 2D read-only numpy
+    strided view, each row is a window. The array is copied
+    once into a new array with the first ``size - 1`` items appended to close
+    the cycle, the windows are views of it. The ``copy`` parameter is
+    ignored in this case. Any other input, including ``array.array``,
+    generates lists or :class:`WindowView` as above.
+
     **中文文档**
 
-    循环位移滑窗函数.
+    循环位移滑窗函数. 当 ``copy=False`` 时, 每个窗口是一个指向原始数据的只读
+    :class:`WindowView`. 如果输入是 numpy 数组, 则返回一个二维 numpy 视图,
+    每一行是一个窗口, 此时 ``copy`` 参数无效. 其他输入 (包括 ``array.array``)
+    不使用 numpy.
     """
     if size > len(lst):
         raise ValueError("size can not be greater than length of iterable.")
 
+    arr = _as_ndarray(lst)
+    if arr is not None:
+        import numpy as np
+        from numpy.lib.stride_tricks import sliding_window_view
+
+        extended = np.concatenate([arr, arr[: size - 1]])
+        return sliding_window_view(extended, size)[: len(arr)]
+    if (copy is False) and isinstance(lst, collections.abc.Sequence):
+        return (WindowView(lst, i, size) for i in range(len(lst)))
+    return _cycle_running_window(lst, size)
+
+
+def _cycle_running_window(lst: list, size: int):
     fifo = collections.deque(maxlen=size)
     cycle = itertools.cycle(lst)
     counter = itertools.count(1)
@@ -265,6 +788,175 @@ def cycle_running_window(lst: list, size: int) -> list:
                 break
 
 
+# --- Rolling Aggregation ---
+def _rolling_source(iterable: T.Iterable, size: int, cycle: bool = False):
+    """
+    Iterate the items, if ``cycle`` is True, repeat the first ``size - 1``
+    items at the end, so the last windows wrap around like
+    :func:`cycle_running_window`. Raise ``ValueError`` if there are fewer
+    than ``size`` items.
+    """
+    if size < 1:
+        raise ValueError("size has to be greater than zero!")
+    head = list()
+    counter = 0
+    for item in iterable:
+        if cycle and counter < size - 1:
+            head.append(item)
+        counter += 1
+        yield item
+    if counter < size:
+        raise ValueError("size can not be greater than length of iterable.")
+    for item in head:
+        yield item
+
+
+def rolling_sum(iterable: T.Iterable, size: int, cycle: bool = False):
+    """
+    Generate the sum of each n-size running window, in O(1) per window.
+
+    It is equivalent to ``(sum(w) for w in running_window(iterable, size))``,
+    or ``cycle_running_window`` if ``cycle`` is True.
+
+    Example::
+
+        >>> list(rolling_sum([1, 2, 3, 4, 5], size=3))
+        [6, 9, 12]
+
+        >>> list(rolling_sum([1, 2, 3, 4, 5], size=3, cycle=True))
+        [6, 9, 12, 10, 8]
+
+    **中文文档**
+
+    滑窗求和. 维护一个累加和, 每次只加上新进入的元素, 减去离开的元素, 每个窗口的
+    计算复杂度为 O(1). 可以接受任意可循环对象. ``cycle=True`` 时等同于循环滑窗.
+    """
+    fifo = collections.deque()
+    total = 0
+    for x in _rolling_source(iterable, size, cycle):
+        fifo.append(x)
+        total += x
+        if len(fifo) > size:
+            total -= fifo.popleft()
+        if len(fifo) == size:
+            yield total
+
+
+def rolling_mean(iterable: T.Iterable, size: int, cycle: bool = False):
+    """
+    Generate the mean of each n-size running window, in O(1) per window.
+
+    Example::
+
+        >>> list(rolling_mean([1, 2, 3, 4, 5], size=3))
+        [2.0, 3.0, 4.0]
+
+    **中文文档**
+
+    滑窗求平均值, 每个窗口的计算复杂度为 O(1).
+    """
+    for total in rolling_sum(iterable, size, cycle):
+        yield total / size
+
+
+def rolling_var(
+    iterable: T.Iterable,
+    size: int,
+    cycle: bool = False,
+    ddof: int = 0,
+):
+    """
+    Generate the variance of each n-size running window, in O(1) per window.
+    It uses the Welford algorithm to update the mean and the sum of squared
+    deviation incrementally.
+
+    :param ddof: delta degrees of freedom, the divisor is ``size - ddof``.
+        0 for population variance, 1 for sample variance.
+
+    Example::
+
+        >>> list(rolling_var([1, 2, 3, 4, 5], size=3))
+        [0.6666666666666666, 0.6666666666666666, 0.6666666666666666]
+
+    **中文文档**
+
+    滑窗求方差, 使用 Welford 算法增量更新平均值和离差平方和, 每个窗口的计算复杂度
+    为 O(1). ``ddof=0`` 时为总体方差, ``ddof=1`` 时为样本方差.
+    """
+    if size - ddof <= 0:
+        raise ValueError("size - ddof has to be greater than zero!")
+    fifo = collections.deque()
+    mean = 0.0
+    m2 = 0.0
+    for x in _rolling_source(iterable, size, cycle):
+        fifo.append(x)
+        if len(fifo) <= size:  # warm up
+            n = len(fifo)
+            delta = x - mean
+            mean += delta / n
+            m2 += delta * (x - mean)
+        else:
+            x_old = fifo.popleft()
+            new_mean = mean + (x - x_old) / size
+            m2 += (x - x_old) * (x - new_mean + x_old - mean)
+            mean = new_mean
+        if len(fifo) == size:
+            yield max(m2, 0.0) / (size - ddof)
+
+
+def _rolling_extreme(
+    iterable: T.Iterable,
+    size: int,
+    cycle: bool,
+    evict: T.Callable[[T.Any, T.Any], bool],
+):
+    # monotonic deque of (index, value), the head is the extreme value
+    # of the current window, each item is pushed and popped at most once
+    candidates = collections.deque()
+    for index, x in enumerate(_rolling_source(iterable, size, cycle)):
+        while candidates and evict(candidates[-1][1], x):
+            candidates.pop()
+        candidates.append((index, x))
+        if candidates[0][0] <= index - size:
+            candidates.popleft()
+        if index >= size - 1:
+            yield candidates[0][1]
+
+
+def rolling_min(iterable: T.Iterable, size: int, cycle: bool = False):
+    """
+    Generate the min value of each n-size running window, in amortized O(1)
+    per window using a monotonic deque.
+
+    Example::
+
+        >>> list(rolling_min([3, 1, 4, 1, 5], size=2))
+        [1, 1, 1, 1]
+
+    **中文文档**
+
+    滑窗求最小值, 使用单调队列实现, 每个窗口的均摊计算复杂度为 O(1).
+    """
+    return _rolling_extreme(iterable, size, cycle, operator.ge)
+
+
+def rolling_max(iterable: T.Iterable, size: int, cycle: bool = False):
+    """
+    Generate the max value of each n-size running window, in amortized O(1)
+    per window using a monotonic deque.
+
+    Example::
+
+        >>> list(rolling_max([3, 1, 4, 1, 5], size=2))
+        [3, 4, 4, 5]
+
+    **中文文档**
+
+    滑窗求最大值, 使用单调队列实现, 每个窗口的均摊计算复杂度为 O(1).
+    """
+    return _rolling_extreme(iterable, size, cycle, operator.le)
+
+
 # --- Cycle ---
 def cycle_slice(sliceable: list, start: int, end: int) -> list:
     """
@@ -342,10 +1034,20 @@ def cyclic_shift(array: list, shift: int) -> list:
         >>> cyclic_shift([0, 1, 2], -1)
         [1, 2, 0]
 
+    If ``array`` is a ``numpy.ndarray``, it returns a new numpy array, same
+    as ``numpy.roll(array, shift)``. Any other input, including
+    ``array.array``, returns the same type as the input.
+
     **中文文档**
 
-    循环位移函数.
+    循环位移函数. 如果输入是 numpy 数组, 则使用 ``numpy.roll``. 其他输入
+    (包括 ``array.array``) 返回与输入相同的类型.
     """
+    arr = _as_ndarray(array)
+    if arr is not None:
+        import numpy as np
+
+        return np.roll(arr, shift)
     shift = shift % len(array)
     return array[-shift:] + array[:-shift]
 
@@ -375,19 +1077,32 @@ def shift_and_trim(array: list, shift: int) -> list:
 
         >>> shift_and_trim(array, -3)
         []
+
+    If ``array`` is a ``numpy.ndarray``, it returns a numpy view of the
+    original data (no data is copied). Any other input, including
+    ``array.array``, returns a slice of the same type as the input.
     """
-    length = len(array)
-    if length == 0:
-        return []
+    arr = _as_ndarray(array)
+    if arr is not None:
+        length = len(arr)
+        if (shift >= length) or (shift <= -length):
+            return arr[:0]
+        elif shift < 0:
+            return arr[-shift:]
+        elif shift > 0:
+            return arr[:-shift]
+        else:
+            return arr[:]
 
+    length = len(array)
     if (shift >= length) or (shift <= -length):
-        return []
+        return array[:0]
     elif shift < 0:
         return array[-shift:]
     elif shift > 0:
         return array[:-shift]
     else:
-        return list(array)
+        return array[:]
 
 
 def shift_and_pad(array: list, shift: int, pad: T.Any = "__null__") -> list:
@@ -419,7 +1134,17 @@ def shift_and_pad(array: list, shift: int, pad: T.Any = "__null__") -> list:
 
         >>> shift_and_pad(array, -1, None)
         [None, 0, 1]
+
+    If ``array`` is a ``numpy.ndarray``, it returns a new numpy array, the
+    dtype is promoted if the ``pad`` value doesn't fit. Any other input,
+    including ``array.array``, returns a new list.
     """
+    arr = _as_ndarray(array)
+    if arr is not None:
+        return _np_shift_and_pad(arr, shift, pad)
+
+    if not isinstance(array, list):
+        array = list(array)
     length = len(array)
     if length == 0:
         return []
@@ -456,22 +1181,90 @@ def shift_and_pad(array: list, shift: int, pad: T.Any = "__null__") -> list:
         raise NotImplementedError
 
 
-def size_of_generator(generator: T.Iterable, memory_efficient=True) -> int:
+def _np_shift_and_pad(arr, shift: int, pad: T.Any = "__null__"):
+    import numpy as np
+
+    length = len(arr)
+    if length == 0 or shift == 0:
+        return arr.copy()
+
+    if isinstance(pad, str) and pad == "__null__":
+        padding_item = arr[0] if shift > 0 else arr[-1]
+    else:
+        padding_item = pad
+
+    n_pad = min(abs(shift), length)
+    padding = np.full(n_pad, padding_item)
+    if shift > 0:
+        return np.concatenate([padding, arr[: length - n_pad]])
+    else:
+        return np.concatenate([arr[n_pad:], padding])
+
+
+def _count_lines(f, chunk_size: int = 1024 * 1024) -> int:
+    newline = None
+    counter = 0
+    last_chunk = None
+    while True:
+        chunk = f.read(chunk_size)
+        if not chunk:
+            break
+        if newline is None:
+            newline = b"\n" if isinstance(chunk, bytes) else "\n"
+        counter += chunk.count(newline)
+        last_chunk = chunk
+    # the last line doesn't end with a newline
+    if last_chunk and (not last_chunk.endswith(newline)):
+        counter += 1
+    return counter
+
+
+def size_of_generator(
+    generator: T.Iterable,
+    memory_efficient: bool = True,
+    use_length_hint: bool = False,
+) -> int:
     """Get number of items in a generator function.
 
-    - memory_efficient = True, 3 times slower, but memory_efficient.
-    - memory_efficient = False, faster, but cost more memory.
+    It tries these strategies in order:
+
+    1. if the object has ``len()``, return it, nothing is consumed.
+    2. if ``use_length_hint`` is True and ``operator.length_hint`` returns
+        a positive number, return it, nothing is consumed. Note that the hint
+        is only exact for built-in iterators like ``iter(list)``.
+    3. if the object is a file-like object (has ``read`` method), count the
+        number of lines by reading it in 1 MB chunks.
+    4. consume the iterator:
+
+        - memory_efficient = True, consume it in C speed by chunks of 4096
+          items with ``len(list(itertools.islice(generator, 4096)))``, at most
+          one chunk is kept in memory. It is faster than
+          ``collections.deque(zip(generator, itertools.count()), maxlen=0)``.
+        - memory_efficient = False, ``len(list(generator))``, cost more memory.
 
     **中文文档**
 
-    计算一个生成器函数中的元素的个数。使用memory_efficient=True的方法可以避免将生成器中的
-    所有元素放入内存, 但是速度稍慢于memory_efficient=False的方法。
+    计算一个生成器函数中的元素的个数. 如果对象支持 ``len()`` 则直接返回. 如果是
+    文件对象, 则按 1 MB 的块读取并统计换行符个数. 否则使用 memory_efficient=True
+    的方法可以避免将生成器中的所有元素放入内存, 而是每次只读取 4096 个元素,
+    计数循环在 C 语言层面完成, 速度与 memory_efficient=False 的方法相当.
     """
+    if hasattr(generator, "__len__"):
+        return len(generator)
+    if use_length_hint:
+        hint = operator.length_hint(generator)
+        if hint > 0:
+            return hint
+    if hasattr(generator, "read"):
+        return _count_lines(generator)
     if memory_efficient:
+        iterator = iter(generator)
         counter = 0
-        for _ in generator:
-            counter += 1
-        return counter
+        while True:
+            n = len(list(itertools.islice(iterator, 4096)))
+            counter += n
+            if n < 4096:
+                return counter
     else:
         return len(list(generator))
 
@@ -490,20 +1283,30 @@ def difference(array: list, k: int = 1) -> list:
 
         >>> difference([0, 1, 3, 6, 10], 2)
         [3, 5, 7]
+
+    If ``array`` is a ``numpy.ndarray``, it returns a new numpy array,
+    computed by vectorized ``array[k:] - array[:-k]``. Any other input,
+    including ``array.array``, returns a list.
     """
     if (len(array) - k) < 1:
         raise ValueError()
     if k < 0:
         raise ValueError("k has to be greater or equal than zero!")
-    elif k == 0:
+
+    arr = _as_ndarray(array)
+    if arr is not None:
+        import numpy as np
+
+        if k == 0:
+            return np.zeros_like(arr)
+        return arr[k:] - arr[:-k]
+
+    if k == 0:
         return [i - i for i in array]
     else:
         return [j - i for i, j in zip(array[:-k], array[k:])]
 
 
-KT = T.TypeVar("KT")
-VT = T.TypeVar("VT")
-
 def group_by(
     iterable: T.Iterable[VT],
     get_key: T.Callable[[VT], KT],
@@ -550,3 +1353,292 @@ def group_by(
         except KeyError:
             grouped[key] = [item]
     return grouped
+
+
+def group_reduce(
+    iterable: T.Iterable[VT],
+    get_key: T.Callable[[VT], KT],
+    reducer: T.Callable[[T.Any, VT], T.Any],
+    initial: T.Any = _NOTHING,
+) -> T.Dict[KT, T.Any]:
+    """
+    Group items by it's key and fold the items of each group with ``reducer``
+    incrementally, like ``functools.reduce``. Only one accumulated value
+    per key is kept in memory, no list of items is created.
+
+    :param reducer: a function that takes ``(accumulated, item)`` and returns
+        the new accumulated value.
+    :param initial: the initial accumulated value of each key, it is
+        shallow copied for each key. If not given, the first item of each
+        group is the initial value.
+
+    Example::
+
+        >>> records = [("apple", 10), ("apple", 20), ("banana", 30)]
+        >>> group_reduce(
+        ...     records,
+        ...     get_key=lambda x: x[0],
+        ...     reducer=lambda acc, x: acc + x[1],
+        ...     initial=0,
+        ... )
+        {"apple": 30, "banana": 30}
+
+    **中文文档**
+
+    按照 key 分组, 并用 ``reducer`` 对每组中的元素进行增量聚合. 内存中每个 key
+    只保留一个聚合值, 而不会创建包含所有元素的列表.
+    """
+    reduced = dict()
+    if initial is _NOTHING:
+        for item in iterable:
+            key = get_key(item)
+            if key in reduced:
+                reduced[key] = reducer(reduced[key], item)
+            else:
+                reduced[key] = item
+    else:
+        for item in iterable:
+            key = get_key(item)
+            if key in reduced:
+                reduced[key] = reducer(reduced[key], item)
+            else:
+                reduced[key] = reducer(copy.copy(initial), item)
+    return reduced
+
+
+def count_by(
+    iterable: T.Iterable[VT],
+    get_key: T.Callable[[VT], KT],
+) -> T.Dict[KT, int]:
+    """
+    Count the number of items by it's key.
+
+    Example::
+
+        >>> count_by(["apple", "avocado", "banana"], get_key=lambda x: x[0])
+        {"a": 2, "b": 1}
+
+    **中文文档**
+
+    按照 key 计数, 等效于 ``{k: len(v) for k, v in group_by(...).items()}``,
+    但不会创建列表.
+    """
+    return dict(collections.Counter(map(get_key, iterable)))
+
+
+def top_k_by(
+    iterable: T.Iterable[VT],
+    get_key: T.Callable[[VT], KT],
+    k: int,
+    sort_key: T.Optional[T.Callable[[VT], T.Any]] = None,
+    largest: bool = True,
+) -> T.Dict[KT, T.List[VT]]:
+    """
+    Find the top k items of each group, only k items per key are kept in
+    memory. For example, ``k=1`` and ``sort_key=lambda x: x.date`` keeps the
+    latest record of each key.
+
+    :param k: number of items to keep for each key.
+    :param sort_key: a function that returns the value to compare, default
+        is the item itself.
+    :param largest: if True, keep the largest, otherwise keep the smallest.
+        The returned list starts with the largest / smallest item.
+
+    Example::
+
+        >>> records = [("apple", 10), ("apple", 30), ("apple", 20), ("banana", 30)]
+        >>> top_k_by(records, get_key=lambda x: x[0], k=2, sort_key=lambda x: x[1])
+        {"apple": [("apple", 30), ("apple", 20)], "banana": [("banana", 30)]}
+
+    **中文文档**
+
+    找出每个分组中最大 (或最小) 的 k 个元素. 每个 key 使用一个大小为 k 的堆, 内存中
+    每个 key 最多只保留 k 个元素.
+    """
+    if k < 1:
+        raise ValueError("k has to be greater than zero!")
+    if sort_key is None:
+        sort_key = lambda x: x
+    # heap item is (sort value, sequence, item), the sequence prevent
+    # from comparing the items and keep the earlier one on ties
+    heaps = dict()
+    counter = itertools.count()
+    for item in iterable:
+        key = get_key(item)
+        if largest:
+            entry = (sort_key(item), -next(counter), item)
+        else:
+            entry = (_Reversed(sort_key(item)), -next(counter), item)
+        try:
+            heap = heaps[key]
+        except KeyError:
+            heaps[key] = [entry]
+            continue
+        if len(heap) < k:
+            heapq.heappush(heap, entry)
+        elif heap[0] < entry:
+            heapq.heapreplace(heap, entry)
+    return {
+        key: [entry[2] for entry in sorted(heap, reverse=True)]
+        for key, heap in heaps.items()
+    }
+
+
+class _Reversed:
+    """
+    Reverse the comparison of a value, so a min heap works as a max heap.
+    """
+
+    __slots__ = ("value",)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __lt__(self, other: "_Reversed") -> bool:
+        return other.value < self.value
+
+    def __eq__(self, other: "_Reversed") -> bool:
+        return self.value == other.value
+
+
+def parallel_group_reduce(
+    iterable: T.Iterable[VT],
+    get_key: T.Callable[[VT], KT],
+    reducer: T.Callable[[T.Any, VT], T.Any],
+    combine: T.Callable[[T.Any, T.Any], T.Any],
+    initial: T.Any = _NOTHING,
+    n: int = 10000,
+    executor: T.Union[
+        str, ExecutorEnum, concurrent.futures.Executor
+    ] = ExecutorEnum.process,
+    max_workers: T.Optional[int] = None,
+) -> T.Dict[KT, T.Any]:
+    """
+    The parallel version of :func:`group_reduce`. The iterable is chunked into
+    n-size batches, each batch is reduced to a partial aggregate in a worker
+    by :func:`group_reduce`, then the partial aggregates of the same key are
+    merged by ``combine`` in the main process.
+
+    :param combine: a function that merges two accumulated values of the
+        same key. For sum it is ``operator.add``.
+    :param n: batch size.
+    :param executor: see :func:`parallel_map_batches`. ``get_key``,
+        ``reducer`` and the items have to be picklable for the process executor.
+
+    **中文文档**
+
+    :func:`group_reduce` 的并行版本. 将数据分批, 每一批在 worker 中用
+    :func:`group_reduce` 计算局部聚合值, 然后在主进程中用 ``combine`` 合并同一个
+    key 的局部聚合值.
+    """
+    kwargs = dict(get_key=get_key, reducer=reducer)
+    if initial is not _NOTHING:
+        kwargs["initial"] = initial
+    reduced = dict()
+    for partial in parallel_map_batches(
+        iterable,
+        n=n,
+        func=functools.partial(group_reduce, **kwargs),
+        executor=executor,
+        max_workers=max_workers,
+    ):
+        for key, value in partial.items():
+            if key in reduced:
+                reduced[key] = combine(reduced[key], value)
+            else:
+                reduced[key] = value
+    return reduced
+
+
+def group_by_sorted(
+    iterable: T.Iterable[VT],
+    get_key: T.Callable[[VT], KT],
+) -> T.Iterable[T.Tuple[KT, T.List[VT]]]:
+    """
+    Group items by it's key, assuming the items with the same key are
+    consecutive (e.g. sorted by key). It yields ``(key, items)`` lazily, only
+    one group is kept in memory at a time.
+
+    Example::
+
+        >>> list(group_by_sorted([1, 1, 2, 3, 3], get_key=lambda x: x))
+        [(1, [1, 1]), (2, [2]), (3, [3, 3])]
+
+    **中文文档**
+
+    对已经按照 key 排好序的数据进行分组, 逐个返回 ``(key, items)``, 内存中最多只有
+    一个分组的数据.
+    """
+    for key, group in itertools.groupby(iterable, key=get_key):
+        yield key, list(group)
+
+
+def _dump_run(records: T.List[T.Tuple[KT, VT]], dir: T.Optional[str] = None):
+    f = tempfile.TemporaryFile(dir=dir)
+    for record in records:
+        pickle.dump(record, f, protocol=pickle.HIGHEST_PROTOCOL)
+    f.seek(0)
+    return f
+
+
+def _load_run(f) -> T.Iterable[T.Tuple[KT, VT]]:
+    while True:
+        try:
+            yield pickle.load(f)
+        except EOFError:
+            return
+
+
+def group_by_external(
+    iterable: T.Iterable[VT],
+    get_key: T.Callable[[VT], KT],
+    max_items_in_memory: int = 1000000,
+    dir: T.Optional[str] = None,
+) -> T.Iterable[T.Tuple[KT, T.List[VT]]]:
+    """
+    Group items by it's key for data larger than memory, using external sort.
+    It yields ``(key, items)`` lazily, in ascending order of the key. The
+    keys have to be sortable and the items have to be picklable.
+
+    Items are buffered in memory, once the buffer has ``max_items_in_memory``
+    items, it is sorted by key and spilled to a temp file. At the end, all
+    sorted files are merged and grouped. The order of the items in a group
+    is the same as the input order.
+
+    :param max_items_in_memory: the max number of items to buffer before
+        spilling to disk.
+    :param dir: the directory for the temp files, default is the system
+        temp directory.
+
+    **中文文档**
+
+    适用于数据量大于内存的分组. 使用外部排序算法: 当内存中缓存的数据量超过
+    ``max_items_in_memory`` 时, 将其按照 key 排序后写入临时文件. 最后将所有排好序
+    的文件归并, 然后逐个返回 ``(key, items)``. 要求 key 可以排序, item 可以被
+    pickle 序列化.
+    """
+    if max_items_in_memory < 1:
+        raise ValueError("max_items_in_memory has to be greater than zero!")
+    get_record_key = operator.itemgetter(0)
+    runs = list()
+    try:
+        buffer = list()
+        for item in iterable:
+            buffer.append((get_key(item), item))
+            if len(buffer) >= max_items_in_memory:
+                buffer.sort(key=get_record_key)
+                runs.append(_dump_run(buffer, dir))
+                buffer = list()
+        buffer.sort(key=get_record_key)
+
+        # the in-memory buffer comes last to keep the input order in a group
+        merged = heapq.merge(
+            *[_load_run(f) for f in runs],
+            buffer,
+            key=get_record_key,
+        )
+        for key, group in itertools.groupby(merged, key=get_record_key):
+            yield key, [item for _, item in group]
+    finally:
+        for f in runs:
+            f.close()
@@ -32,15 +32,26 @@ The Output looks like::
 """
 
 import typing as T
+import re
 import sys
 import enum
+import json
+import time
+import os
+import queue
+import atexit
 import logging
+import contextvars
+import logging.handlers
+import warnings
 import contextlib
+import collections.abc
 from functools import wraps
 from datetime import datetime
 
 __version__ = "0.2.1"
 
+
 def create_logger(
     name: T.Optional[str] = None,
     level: int = logging.INFO,
@@ -112,6 +123,23 @@ def format_line(
     return f"{nesting}{tab * indent}{msg}"
 
 
+#: the level of the ``func`` argument of the ruler in json mode
+_FUNC_LEVELS = {
+    "debug": logging.DEBUG,
+    "info": logging.INFO,
+    "warning": logging.WARNING,
+    "error": logging.ERROR,
+    "exception": logging.ERROR,
+    "critical": logging.CRITICAL,
+}
+
+#: a %-style placeholder, the rarely used space flag is excluded so that a
+#: message like "50% done" is not treated as a format string
+_PLACEHOLDER = re.compile(
+    r"%(\([^)]*\))?[#0+\-]*(\*|\d+)?(\.(\*|\d+))?[diouxXeEfFgGcrsa]"
+)
+
+
 class AlignEnum(str, enum.Enum):
     left = "<"
     right = ">"
@@ -183,6 +211,99 @@ def format_ruler(
     return s
 
 
+class OverflowEnum(str, enum.Enum):
+    """
+    What to do when the queue of the async mode is full.
+
+    - block: wait until the background thread writes some records.
+    - drop: drop the new record, never block the caller.
+    """
+
+    block = "block"
+    drop = "drop"
+
+
+class BoundedQueueHandler(logging.handlers.QueueHandler):
+    """
+    A ``QueueHandler`` that puts the record into a bounded queue, and either
+    blocks or drops the record when the queue is full.
+
+    :param dropped: the number of dropped records.
+    """
+
+    def __init__(
+        self,
+        queue: queue.Queue,
+        overflow: OverflowEnum = OverflowEnum.block,
+    ):
+        super().__init__(queue)
+        self.overflow = OverflowEnum(overflow)
+        self.dropped = 0
+
+    def enqueue(self, record: logging.LogRecord):
+        if self.overflow is OverflowEnum.block:
+            self.queue.put(record)
+        else:
+            try:
+                self.queue.put_nowait(record)
+            except queue.Full:
+                self.dropped += 1
+
+
+class _QueueListener(logging.handlers.QueueListener):
+    def enqueue_sentinel(self):
+        # the default put_nowait raises queue.Full on a full bounded queue
+        self.queue.put(self._sentinel)
+
+
+class _NestState:
+    """
+    The immutable nesting state of a :class:`NestedLogger` in the current
+    thread or asyncio task. Every change creates a new state, so the state
+    can be shared by the copied contexts safely.
+
+    ``nesting`` and ``prefix`` are the lazy caches of ``"".join(pipes)`` and
+    the nesting plus the indentation.
+    """
+
+    __slots__ = ("indent", "nest", "pipes", "nesting", "prefix")
+
+    def __init__(self, indent: int, nest: int, pipes: T.Tuple[str, ...]):
+        self.indent = indent
+        self.nest = nest
+        self.pipes = pipes
+        self.nesting: T.Optional[str] = None
+        self.prefix: T.Optional[str] = None
+
+
+class Span:
+    """
+    A span is a block of code measured by :meth:`NestedLogger.span`, or a
+    function decorated by :meth:`NestedLogger.pretty_log` in the JSON mode.
+
+    :param span_id: 16 hex characters random id.
+    :param parent_id: the span id of the enclosing span, None for the root.
+    :param depth: the number of enclosing spans.
+    :param start: the start time in seconds since epoch.
+    """
+
+    __slots__ = ("name", "span_id", "parent_id", "depth", "start")
+
+    def __init__(
+        self,
+        name: str,
+        span_id: str,
+        parent_id: T.Optional[str],
+        depth: int,
+        start: float,
+    ):
+        self.name = name
+        self.span_id = span_id
+        self.parent_id = parent_id
+        self.depth = depth
+        self.start = start
+
+
 def decohints(decorator: T.Callable) -> T.Callable:
     """
     fix pycharm type hint bug for decorator.
@@ -193,6 +314,15 @@ def decohints(decorator: T.Callable) -> T.Callable:
 class NestedLogger:
     """
     A logger that supports nested logging.
+
+    The indentation, nesting and pipes are stored per thread and per asyncio
+    task, so one logger can be shared by concurrent workers. A new thread
+    starts from the top level, a new asyncio task starts from the nesting
+    state of where it is created.
+
+    :param json_mode: if True, log one JSON record per log call and per
+        span instead of the ascii rulers and pipes, see :meth:`span`. You may
+        want to use ``log_format="%(message)s"`` with it.
     """
 
     def __init__(
@@ -204,6 +334,7 @@ class NestedLogger:
         datetime_format: str = "%Y-%m-%d %H:%m:%S",
         tab: str = DEFAULT_TAB,
         pipe: str = DEFAULT_PIPE,
+        json_mode: bool = False,
     ):
         if logger is None:
             self._logger = create_logger(
@@ -215,16 +346,109 @@ class NestedLogger:
         else:  # pragma: no cover
             self._logger = logger
 
-        # ``_indent`` stores the current level of indentation
-        self._indent = 0
         self._tab = tab
-        # ``_nest`` stores the current level of nesting
-        self._nest = 0
-        # ``_pipes`` is a first in last out stack data structure that stores
-        # the list of pipe character for different level of nesting
-        self._pipes = [
-            pipe,
-        ]
+        # the nesting state is stored in a context variable, so each thread
+        # and each asyncio task has its own indentation, nesting and pipes,
+        # one logger can be shared by concurrent workers
+        self._initial_state = _NestState(indent=0, nest=0, pipes=(pipe,))
+        self._state: contextvars.ContextVar = contextvars.ContextVar(
+            f"nested_logger_state_{id(self)}"
+        )
+        # in JSON mode, each log call and each span is one JSON record
+        self.json_mode = json_mode
+        self._span: contextvars.ContextVar = contextvars.ContextVar(
+            f"nested_logger_span_{id(self)}"
+        )
+        # the background writer of the async mode
+        self._queue_handler: T.Optional[BoundedQueueHandler] = None
+        self._queue_listener: T.Optional[_QueueListener] = None
+
+    def _get_state(self) -> _NestState:
+        return self._state.get(self._initial_state)
+
+    @property
+    def _indent(self) -> int:
+        """
+        The current level of indentation.
+        """
+        return self._get_state().indent
+
+    @property
+    def _nest(self) -> int:
+        """
+        The current level of nesting.
+        """
+        return self._get_state().nest
+
+    @property
+    def _pipes(self) -> T.Tuple[str, ...]:
+        """
+        A first in last out stack that stores the pipe character for
+        different level of nesting.
+        """
+        return self._get_state().pipes
+
+    def enable_async(
+        self,
+        max_queue_size: int = 10000,
+        overflow: OverflowEnum = OverflowEnum.block,
+    ) -> "NestedLogger":
+        """
+        Write log in a background thread. The caller only formats the line
+        and puts the record into a bounded queue, the original handlers of
+        the logger run in the background thread, so slow stream (network,
+        log agent) doesn't block the caller.
+
+        Call :meth:`disable_async` to write all queued records and go back
+        to the synchronous mode, it is also called at interpreter exit.
+
+        :param max_queue_size: the max number of records in the queue.
+        :param overflow: block the caller or drop the record when the queue
+            is full. The number of dropped records is :attr:`dropped`.
+
+        **中文文档**
+
+        开启异步模式. 调用者只负责格式化并把日志放入一个有界队列, 由后台线程调用原来的
+        handler 写入日志, 这样慢速的输出不会阻塞调用者. 队列满时根据 ``overflow``
+        选择阻塞或是丢弃日志.
+        """
+        if self._queue_listener is not None:
+            raise RuntimeError("async mode is already enabled")
+        if max_queue_size < 1:
+            raise ValueError("max_queue_size cannot smaller than 1")
+        q = queue.Queue(maxsize=max_queue_size)
+        handlers = list(self._logger.handlers)
+        self._queue_handler = BoundedQueueHandler(q, overflow=overflow)
+        self._queue_listener = _QueueListener(q, *handlers, respect_handler_level=True)
+        self._logger.handlers.clear()
+        self._logger.addHandler(self._queue_handler)
+        self._queue_listener.start()
+        atexit.register(self.disable_async)
+        return self
+
+    def disable_async(self) -> "NestedLogger":
+        """
+        Write all queued records, stop the background thread and restore the
+        original handlers.
+        """
+        if self._queue_listener is None:
+            return self
+        atexit.unregister(self.disable_async)
+        self._queue_listener.stop()
+        self._logger.removeHandler(self._queue_handler)
+        for handler in self._queue_listener.handlers:
+            self._logger.addHandler(handler)
+        self._queue_listener = None
+        return self
+
+    @property
+    def dropped(self) -> int:
+        """
+        The number of dropped records in async mode with ``overflow="drop"``.
+        """
+        if self._queue_handler is None:
+            return 0
+        return self._queue_handler.dropped
 
     def _pipe_start(
         self,
@@ -232,9 +456,9 @@ class NestedLogger:
     ) -> T.Optional[str]:
         if pipe is not None:
             pipe = encode_pipe(pipe)
-            current_pipe = self._pipes.pop()
-            self._pipes.append(pipe)
-            return current_pipe
+            st = self._get_state()
+            self._state.set(_NestState(st.indent, st.nest, st.pipes[:-1] + (pipe,)))
+            return st.pipes[-1]
         else:
             return None
 
@@ -244,8 +468,10 @@ class NestedLogger:
         last_pipe: T.Optional[str] = None,
     ):
         if pipe is not None:
-            self._pipes.pop()
-            self._pipes.append(last_pipe)
+            st = self._get_state()
+            self._state.set(
+                _NestState(st.indent, st.nest, st.pipes[:-1] + (last_pipe,))
+            )
 
     @contextlib.contextmanager
     def pipe(
@@ -258,42 +484,200 @@ class NestedLogger:
         finally:
             self._pipe_end(pipe, last_pipe)
 
+    @staticmethod
+    def _get_nesting(st: _NestState) -> str:
+        """
+        Return the pipes of the nesting state, it is cached in the state.
+        """
+        if st.nesting is None:
+            st.nesting = "".join(st.pipes)
+        return st.nesting
+
+    def _get_prefix(self, st: _NestState) -> str:
+        """
+        Return the pipes and indentation before the message, it is cached
+        in the state.
+        """
+        if st.prefix is None:
+            st.prefix = self._get_nesting(st) + self._tab * st.indent
+        return st.prefix
+
     def _log(
         self,
-        func: T.Callable,
+        level: int,
         msg: str,
+        args: tuple = (),
         indent: int = 0,
         tab: T.Optional[str] = None,
         pipe: T.Optional[str] = None,
     ) -> str:
-        if tab is None:
-            tab = self._tab
-        with self.pipe(pipe=pipe):
-            lines = msg.split("\n")
-            for line in lines:
-                output = format_line(
-                    msg=line,
-                    indent=self._indent + indent,
-                    tab=tab,
-                    nest=self._nest,
-                    _pipes=self._pipes,
+        """
+        Log each line of the message with the nesting prefix, return the
+        last line. Nothing is formatted if the level is disabled, and an
+        empty string is returned.
+
+        Like the standard logging, ``msg % args`` is only computed when the
+        level is enabled, and a wrong format string never raises exception
+        in the caller, it is reported by ``logging.Handler.handleError``.
+
+        For backward compatibility, ``indent``, ``tab`` and ``pipe`` can still
+        be given as positional arguments if the message has no placeholder,
+        for example ``logger.info("hello", 2)``. It is deprecated.
+        """
+        if not self._logger.isEnabledFor(level):
+            return ""
+        if args:
+            if (
+                (len(args) <= 3)
+                and (type(args[0]) is int)
+                and (indent == 0)
+                and (tab is None)
+                and (pipe is None)
+                and (_PLACEHOLDER.search(str(msg)) is None)
+            ):
+                warnings.warn(
+                    "passing indent, tab and pipe as positional arguments is "
+                    "deprecated, use keyword arguments instead",
+                    DeprecationWarning,
+                    stacklevel=3,
                 )
-                func(output)
+                indent, tab, pipe = (args + (None, None))[:3]
+            else:
+                # same as logging.LogRecord, a single dict is the mapping
+                if (
+                    (len(args) == 1)
+                    and isinstance(args[0], collections.abc.Mapping)
+                    and args[0]
+                ):
+                    values = args[0]
+                else:
+                    values = args
+                try:
+                    msg = str(msg) % values
+                except Exception:
+                    # let the logging record fail in the handler, it is
+                    # reported by Handler.handleError like the standard logging
+                    self._logger.log(level, msg, *args)
+                    return str(msg)
+        if self.json_mode:
+            output = self._dumps_log(level, msg)
+            self._logger.log(level, output)
+            return output
+        st = self._get_state()
+        if (indent == 0) and (tab is None) and (pipe is None):
+            prefix = self._get_prefix(st)
+        else:
+            if tab is None:
+                tab = self._tab
+            if pipe is None:
+                nesting = self._get_nesting(st)
+            else:
+                nesting = "".join(st.pipes[:-1]) + encode_pipe(pipe)
+            prefix = nesting + tab * (st.indent + indent)
+        for line in msg.split("\n"):
+            output = prefix + line
+            self._logger.log(level, output)
         return output
 
+    def _dumps_log(self, level: int, msg: str) -> str:
+        span = self._span.get(None)
+        return json.dumps(
+            {
+                "type": "log",
+                "time": time.time(),
+                "level": logging.getLevelName(level),
+                "span_id": None if span is None else span.span_id,
+                "depth": 0 if span is None else span.depth + 1,
+                "msg": msg,
+            },
+            ensure_ascii=False,
+            default=str,
+        )
+
+    @contextlib.contextmanager
+    def span(self, name: str):
+        """
+        A context manager that measures a block of code as a span. In JSON
+        mode, a span record is logged when the block ends, and the log
+        records inside the block have the ``span_id`` of it. In text mode,
+        the span is tracked but nothing is logged.
+
+        Example:
+
+        .. code-block:: python
+
+            logger = NestedLogger(log_format="%(message)s", json_mode=True)
+
+            with logger.span("deploy"):
+                logger.info("working ...")
+
+        The output looks like::
+
+            {"type": "log", "time": 1700000000.1, "level": "INFO", "span_id": "8f3c...", "depth": 1, "msg": "working ..."}
+            {"type": "span", "name": "deploy", "span_id": "8f3c...", "parent_id": null, "depth": 0, "start": 1700000000.0, "end": 1700000000.2, "elapsed": 0.2, "exception": null}
+
+        The span is logged with ERROR level if the block raises exception,
+        otherwise INFO level.
+
+        **中文文档**
+
+        把一段代码作为一个 span 进行计时. 在 JSON 模式下, 代码块结束时会输出一条包含
+        span id, parent span id, depth, 开始结束时间, 耗时, 异常信息的 JSON 记录,
+        代码块内的日志也会带上该 span 的 id. 这样就把嵌套的日志变成了一个轻量的
+        tracing 系统.
+        """
+        parent = self._span.get(None)
+        span = Span(
+            name=name,
+            span_id=os.urandom(8).hex(),
+            parent_id=None if parent is None else parent.span_id,
+            depth=0 if parent is None else parent.depth + 1,
+            start=time.time(),
+        )
+        token = self._span.set(span)
+        st = time.perf_counter()
+        exception = None
+        try:
+            yield span
+        except BaseException as e:
+            exception = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            elapsed = time.perf_counter() - st
+            self._span.reset(token)
+            level = logging.INFO if exception is None else logging.ERROR
+            if self.json_mode and self._logger.isEnabledFor(level):
+                record = {
+                    "type": "span",
+                    "name": span.name,
+                    "span_id": span.span_id,
+                    "parent_id": span.parent_id,
+                    "depth": span.depth,
+                    "start": span.start,
+                    "end": span.start + elapsed,
+                    "elapsed": elapsed,
+                    "exception": exception,
+                }
+                self._logger.log(
+                    level, json.dumps(record, ensure_ascii=False, default=str)
+                )
+
     def debug(
         self,
         msg: str,
+        *args,
         indent: int = 0,
         tab: T.Optional[str] = None,
         pipe: T.Optional[str] = None,
     ) -> str:  # pragma: no cover
         """
-        Todo: add docstring
+        Log message with DEBUG level, ``args`` are merged into ``msg``
+        using ``%`` operator, only when the level is enabled.
         """
         return self._log(
-            func=self._logger.debug,
+            level=logging.DEBUG,
             msg=msg,
+            args=args,
             indent=indent,
             tab=tab,
             pipe=pipe,
@@ -302,16 +686,19 @@ class NestedLogger:
     def info(
         self,
         msg: str,
+        *args,
         indent: int = 0,
         tab: T.Optional[str] = None,
         pipe: T.Optional[str] = None,
     ) -> str:
         """
-        Todo: add docstring
+        Log message with INFO level, ``args`` are merged into ``msg``
+        using ``%`` operator, only when the level is enabled.
         """
         return self._log(
-            func=self._logger.info,
+            level=logging.INFO,
             msg=msg,
+            args=args,
             indent=indent,
             tab=tab,
             pipe=pipe,
@@ -320,16 +707,19 @@ class NestedLogger:
     def warning(
         self,
         msg: str,
+        *args,
         indent: int = 0,
         tab: T.Optional[str] = None,
         pipe: T.Optional[str] = None,
     ) -> str:  # pragma: no cover
         """
-        Todo: add docstring
+        Log message with WARNING level, ``args`` are merged into ``msg``
+        using ``%`` operator, only when the level is enabled.
         """
         return self._log(
-            func=self._logger.warning,
+            level=logging.WARNING,
             msg=msg,
+            args=args,
             indent=indent,
             tab=tab,
             pipe=pipe,
@@ -338,16 +728,19 @@ class NestedLogger:
     def error(
         self,
         msg: str,
+        *args,
         indent: int = 0,
         tab: T.Optional[str] = None,
         pipe: T.Optional[str] = None,
     ) -> str:  # pragma: no cover
         """
-        Todo: add docstring
+        Log message with ERROR level, ``args`` are merged into ``msg``
+        using ``%`` operator, only when the level is enabled.
         """
         return self._log(
-            func=self._logger.error,
+            level=logging.ERROR,
             msg=msg,
+            args=args,
             indent=indent,
             tab=tab,
             pipe=pipe,
@@ -356,16 +749,19 @@ class NestedLogger:
     def critical(
         self,
         msg: str,
+        *args,
         indent: int = 0,
         tab: T.Optional[str] = None,
         pipe: T.Optional[str] = None,
     ) -> str:  # pragma: no cover
         """
-        Todo: add docstring
+        Log message with CRITICAL level, ``args`` are merged into ``msg``
+        using ``%`` operator, only when the level is enabled.
         """
         return self._log(
-            func=self._logger.critical,
+            level=logging.CRITICAL,
             msg=msg,
+            args=args,
             indent=indent,
             tab=tab,
             pipe=pipe,
@@ -387,9 +783,18 @@ class NestedLogger:
         Todo: add docstring
         """
         if func is None:
+            if not self._logger.isEnabledFor(logging.INFO):
+                return ""
             func = self._logger.info
+        if self.json_mode:
+            # derive the level from ``func``, e.g. ``logger.warning``
+            level = _FUNC_LEVELS.get(getattr(func, "__name__", None), logging.INFO)
+            output = self._dumps_log(level, msg)
+            func(output)
+            return output
 
         with self.pipe(pipe=pipe):
+            st = self._get_state()
             output = format_ruler(
                 msg,
                 char,
@@ -398,17 +803,19 @@ class NestedLogger:
                 left_padding,
                 right_padding,
                 corner,
-                self._nest,
-                self._pipes[:-1],
+                st.nest,
+                st.pipes[:-1],
             )
             func(output)
         return output
 
     def _indent_start(self, level: int = 1):
-        self._indent += level
+        st = self._get_state()
+        self._state.set(_NestState(st.indent + level, st.nest, st.pipes))
 
     def _indent_end(self, level: int = 1):
-        self._indent -= level
+        st = self._get_state()
+        self._state.set(_NestState(st.indent - level, st.nest, st.pipes))
 
     @contextlib.contextmanager
     def indent(self, level: int = 1):
@@ -455,16 +862,16 @@ class NestedLogger:
         self,
         pipe: T.Optional[str] = None,
     ):
-        self._nest += 1
-
         if pipe is None:
-            self._pipes.append(DEFAULT_PIPE)
+            pipe = DEFAULT_PIPE
         else:  # pragma: no cover
-            self._pipes.append(encode_pipe(pipe))
+            pipe = encode_pipe(pipe)
+        st = self._get_state()
+        self._state.set(_NestState(st.indent, st.nest + 1, st.pipes + (pipe,)))
 
     def _nested_end(self):
-        self._nest -= 1
-        self._pipes.pop()
+        st = self._get_state()
+        self._state.set(_NestState(st.indent, st.nest - 1, st.pipes[:-1]))
 
     @contextlib.contextmanager
     def nested(
@@ -521,6 +928,7 @@ class NestedLogger:
         corner: str = "+",
         nest: int = 0,
         pipe: T.Optional[str] = None,
+        span_name: str = "{func_name}",
     ):
         """
         A decorator that pretty print ruler when a function start, error, end.
@@ -562,6 +970,9 @@ class NestedLogger:
             [User] |
             [User] +----- End my_func1(), elapsed = 2.00 sec ------------------+
 
+        In JSON mode, the function is measured as a :meth:`span` named by
+        the ``span_name`` template, and no ruler is printed.
+
         :return: a decorator that you can put on top of your function
         """
 
@@ -569,6 +980,11 @@ class NestedLogger:
         def deco(func):
             @wraps(func)
             def wrapper(*args, **kwargs):
+                if self.json_mode:
+                    name = span_name.format(func_name=func.__name__, **kwargs)
+                    with self.span(name):
+                        return func(*args, **kwargs)
+
                 st = datetime.utcnow()
 
                 for _ in range(nest):
@@ -701,6 +1117,7 @@ class NestedLogger:
             error_msg=f"⏰ {error_emoji}Error {msg!r}, elapsed = {{elapsed:.2f}} sec",
             end_msg=f"⏰ {end_emoji}End {msg!r}, elapsed = {{elapsed:.2f}} sec",
             pipe=pipe,
+            span_name=msg,
         )
 
     def emoji_block(
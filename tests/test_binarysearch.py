@@ -1,6 +1,7 @@
 # -*- coding: utf-8 -*-
 
 import pytest
+import bisect
 from fixa import binarysearch as bs
 
 
@@ -47,6 +48,59 @@ def test_find_last_true():
 
     assert bs.find_last_true(sorted_list, true_criterion) == 5
 
+    # each item is evaluated at most once
+    for answer in range(10):
+        evaluated = list()
+
+        def true_criterion(item):
+            evaluated.append(item)
+            return item <= answer
+
+        assert bs.find_last_true(sorted_list, true_criterion) == answer
+        assert len(evaluated) == len(set(evaluated))
+
+
+def test_find_last_true_in_range():
+    for answer in [0, 1, 2, 3, 100, 399, 400, 998, 999]:
+        for max_workers in [1, 3]:
+            evaluated = list()
+
+            def predicate(i):
+                evaluated.append(i)
+                return i <= answer
+
+            assert (
+                bs.find_last_true_in_range(
+                    predicate, lower=0, upper=999, max_workers=max_workers
+                )
+                == answer
+            )
+            assert len(evaluated) == len(set(evaluated))
+            if max_workers == 1:
+                assert len(evaluated) <= 2 + 10
+
+            # unbounded range
+            cache = dict()
+            assert (
+                bs.find_last_true_in_range(
+                    lambda i: i <= answer,
+                    lower=0,
+                    max_workers=max_workers,
+                    cache=cache,
+                )
+                == answer
+            )
+            assert cache[answer] is True
+            assert cache[answer + 1] is False
+
+    assert bs.find_last_true_in_range(lambda i: i <= 5, lower=5, upper=5) == 5
+    with pytest.raises(ValueError):
+        bs.find_last_true_in_range(lambda i: False, lower=0, upper=10)
+    with pytest.raises(ValueError):
+        bs.find_last_true_in_range(lambda i: True, lower=10, upper=0)
+    with pytest.raises(ValueError):
+        bs.find_last_true_in_range(lambda i: True, max_workers=0)
+
 
 def test_find_nearest():
     sorted_list = list(range(10))
@@ -57,6 +111,240 @@ def test_find_nearest():
     assert bs.find_nearest(sorted_list, 100) == 9
 
 
+def _expected(func, sorted_list, queries, **kwargs):
+    results = list()
+    for x in queries:
+        try:
+            results.append(func(sorted_list, x, **kwargs))
+        except ValueError:
+            results.append(None)
+    return results
+
+
+def test_find_many():
+    import random
+
+    rnd = random.Random(0)
+
+    sorted_list = sorted(rnd.randint(0, 100) for _ in range(50))
+    cases = [
+        (bs.find_index, bs.find_index_many),
+        (bs.find_lt, bs.find_lt_many),
+        (bs.find_le, bs.find_le_many),
+        (bs.find_gt, bs.find_gt_many),
+        (bs.find_ge, bs.find_ge_many),
+        (bs.find_nearest, bs.find_nearest_many),
+    ]
+    # few queries use bisect, many queries use merge sweep
+    for n_queries in [10, 200]:
+        queries = [
+            rnd.randint(-10, 110) + rnd.random() * (i % 2)
+            for i in range(n_queries)
+        ]
+        for func, func_many in cases:
+            expected = _expected(func, sorted_list, queries)
+            assert func_many(sorted_list, queries) == expected
+            assert func_many(sorted_list, iter(queries)) == expected
+            assert func_many(sorted_list, sorted(queries), queries_sorted=True) == (
+                _expected(func, sorted_list, sorted(queries))
+            )
+
+    assert bs.find_lt_many([0, 1, 2, 3], [0], default=-1) == [-1]
+
+
+def test_find_many_numpy():
+    np = pytest.importorskip("numpy")
+
+    sorted_list = [0, 1, 1, 2, 3, 5, 8]
+    queries = [-1, 0, 1, 1.5, 4, 8, 9]
+    for func, func_many in [
+        (bs.find_index, bs.find_index_many),
+        (bs.find_lt, bs.find_lt_many),
+        (bs.find_le, bs.find_le_many),
+        (bs.find_gt, bs.find_gt_many),
+        (bs.find_ge, bs.find_ge_many),
+        (bs.find_nearest, bs.find_nearest_many),
+    ]:
+        expected = _expected(func, sorted_list, queries)
+        assert func_many(np.array(sorted_list), queries) == expected
+        assert func_many(sorted_list, np.array(queries)) == expected
+
+
+def test_key_and_reverse():
+    import random
+
+    rnd = random.Random(0)
+
+    values = sorted(rnd.randint(0, 50) for _ in range(30))
+    records = [{"id": v} for v in values]
+    get_key = lambda x: x["id"]
+    descending = values[::-1]
+    descending_records = records[::-1]
+    queries = [-1, 0, 0.5, 10, 25.5, 50, 51]
+
+    for name in [
+        "find_index",
+        "find_lt",
+        "find_le",
+        "find_gt",
+        "find_ge",
+        "find_nearest",
+    ]:
+        func = getattr(bs, name)
+        func_many = getattr(bs, f"{name}_many")
+        expected = _expected(func, values, queries)
+        if name == "find_index":
+            expected_desc = [
+                None if i is None else descending.index(values[i]) for i in expected
+            ]
+            expected_records = expected
+            expected_desc_records = expected_desc
+        else:
+            expected_desc = expected
+            expected_records = [None if v is None else {"id": v} for v in expected]
+            expected_desc_records = expected_records
+
+        assert _expected(func, descending, queries, reverse=True) == expected_desc
+        assert _expected(func, records, queries, key=get_key) == expected_records
+        assert (
+            _expected(func, descending_records, queries, key=get_key, reverse=True)
+            == expected_desc_records
+        )
+
+        assert func_many(descending, queries, reverse=True) == expected_desc
+        assert func_many(records, queries, key=get_key) == expected_records
+        assert (
+            func_many(descending_records, queries, key=get_key, reverse=True)
+            == expected_desc_records
+        )
+        for n_queries in [3, 100]:
+            sorted_queries = sorted(
+                rnd.randint(-5, 55) + 0.5 * (i % 2) for i in range(n_queries)
+            )
+            assert func_many(
+                descending_records,
+                sorted_queries,
+                queries_sorted=True,
+                key=get_key,
+                reverse=True,
+            ) == func_many(
+                descending_records, sorted_queries, key=get_key, reverse=True
+            )
+
+    with pytest.raises(ValueError):
+        bs.find_index([3, 2, 1], 5, reverse=True)
+    with pytest.raises(ValueError):
+        bs.find_lt([3, 2, 1], 1, reverse=True)
+
+
+def test_key_and_reverse_numpy():
+    np = pytest.importorskip("numpy")
+
+    descending = np.array([9, 7, 5, 3, 1])
+    assert bs.find_le_many(descending, [0, 4, 9], reverse=True) == [None, 3, 9]
+    assert bs.find_index_many(descending, [7, 8], reverse=True) == [1, None]
+    assert bs.find_ge([9, 7, 5, 3, 1], 4, reverse=True) == 5
+
+
+def test_sorted_list():
+    import random
+
+    rnd = random.Random(0)
+
+    sl = bs.SortedList(load=4)
+    reference = list()
+    for _ in range(500):
+        value = rnd.randint(0, 100)
+        sl.add(value)
+        reference.append(value)
+        if rnd.random() < 0.3:
+            value = rnd.choice(reference)
+            sl.remove(value)
+            reference.remove(value)
+    reference.sort()
+
+    assert len(sl) == len(reference)
+    assert list(sl) == reference
+    assert list(reversed(sl)) == reference[::-1]
+    assert [sl[i] for i in range(len(sl))] == reference
+    assert sl[-1] == reference[-1]
+    with pytest.raises(IndexError):
+        sl[len(sl)]
+
+    for x in [-1, 0, 0.5, 10, 50.5, 100, 101]:
+        assert sl.bisect_left(x) == bisect.bisect_left(reference, x)
+        assert sl.bisect_right(x) == bisect.bisect_right(reference, x)
+        assert (x in sl) == (x in reference)
+        for name in [
+            "find_index",
+            "find_lt",
+            "find_le",
+            "find_gt",
+            "find_ge",
+            "find_nearest",
+        ]:
+            try:
+                expected = getattr(bs, name)(reference, x)
+            except ValueError:
+                with pytest.raises(ValueError):
+                    getattr(sl, name)(x)
+            else:
+                assert getattr(sl, name)(x) == expected
+
+    with pytest.raises(ValueError):
+        sl.remove(1000)
+    sl.discard(1000)
+
+    sl = bs.SortedList([3, 1, 2])
+    sl.update([0, 5])
+    assert repr(sl) == "SortedList([0, 1, 2, 3, 5])"
+
+    sl = bs.SortedList()
+    assert 1 not in sl
+    with pytest.raises(ValueError):
+        sl.find_nearest(1)
+    with pytest.raises(ValueError):
+        bs.SortedList(load=0)
+
+
+def test_interval_index():
+    import random
+
+    rnd = random.Random(0)
+
+    intervals = list()
+    for i in range(300):
+        start = rnd.randint(0, 1000)
+        intervals.append((start, start + rnd.randint(0, 100), i))
+    index = bs.IntervalIndex(intervals)
+    assert len(index) == len(intervals)
+    assert sorted(index) == sorted(intervals)
+
+    for _ in range(100):
+        point = rnd.randint(-10, 1110) + rnd.random() * (_ % 2)
+        expected = sorted(x for x in intervals if x[0] <= point <= x[1])
+        assert sorted(index.stab(point)) == expected
+        assert index.count_stab(point) == len(expected)
+
+        start = rnd.randint(-10, 1110)
+        end = start + rnd.randint(0, 50)
+        expected = sorted(x for x in intervals if x[0] <= end and start <= x[1])
+        assert sorted(index.overlap(start, end)) == expected
+        assert index.count_overlap(start, end) == len(expected)
+
+    index = bs.IntervalIndex([(1, 5, "a"), (3, 8, "b"), (10, 12, "c")])
+    assert sorted(index.stab(4)) == [(1, 5, "a"), (3, 8, "b")]
+    assert sorted(index.overlap(6, 10)) == [(3, 8, "b"), (10, 12, "c")]
+
+    assert bs.IntervalIndex([]).stab(1) == []
+    with pytest.raises(ValueError):
+        bs.IntervalIndex([(2, 1)])
+    with pytest.raises(ValueError):
+        index.overlap(2, 1)
+    with pytest.raises(ValueError):
+        index.count_overlap(2, 1)
+
+
 if __name__ == "__main__":
     from fixa.tests import run_cov_test
 
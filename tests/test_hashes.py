@@ -1,8 +1,14 @@
 # -*- coding: utf-8 -*-
 
+import io
+import zlib
+import hashlib
+import os
+import shutil
 import pytest
+import fixa.hashes
 from pathlib import Path
-from fixa.hashes import hashes, HashAlgoEnum
+from fixa.hashes import hashes, HashAlgoEnum, HashCache, S3ETag, Crc32
 
 
 def test_settings():
@@ -13,6 +19,9 @@ def test_settings():
         .use_sha256()
         .use_sha384()
         .use_sha512()
+        .use_blake2b()
+        .use_blake2s()
+        .use_crc32()
         .use_hexdigesst()
         .use_bytesdigest()
     )
@@ -47,6 +56,391 @@ def test_hash_file():
     assert id1 == id2
 
 
+def test_fast_algos(tmp_path):
+    hashes.use_hexdigesst()
+
+    data = bytes(range(256)) * 1000
+    path = tmp_path / "data.bin"
+    path.write_bytes(data)
+
+    assert hashes.of_bytes(data, algo=HashAlgoEnum.blake2b) == (
+        hashlib.blake2b(data).hexdigest()
+    )
+    assert hashes.of_bytes(data, algo=HashAlgoEnum.blake2s) == (
+        hashlib.blake2s(data).hexdigest()
+    )
+    expected = f"{zlib.crc32(data):08x}"
+    assert hashes.of_bytes(data, algo=HashAlgoEnum.crc32) == expected
+    assert hashes.of_bytes(data, algo=HashAlgoEnum.crc32, hexdigest=False) == (
+        zlib.crc32(data).to_bytes(4, "big")
+    )
+    assert hashes.of_file(path, algo=HashAlgoEnum.crc32) == expected
+    assert hashes.of_file(path, algo=HashAlgoEnum.crc32, use_mmap=True) == expected
+    assert hashes.of_file(path, algo=HashAlgoEnum.crc32, chunk_size=7) == expected
+    assert hashes.of_file_multi(path, algos=["crc32", "blake2b"])["crc32"] == expected
+    assert Crc32(data).copy().hexdigest() == expected
+
+    hashes.use_crc32()
+    assert hashes.of_file(path) == expected
+    with HashCache(":memory:", racy_seconds=0) as cache:
+        assert hashes.of_folder(tmp_path, cache=cache) == hashes.of_folder(tmp_path)
+        assert hashes.of_paths([path], cache=cache) == hashes.of_paths([path])
+        assert len(cache) == 1
+    hashes.use_md5()
+
+
+def test_xxhash(tmp_path):
+    xxhash = pytest.importorskip("xxhash")
+    hashes.use_xxh64().use_xxh3_64().use_xxh3_128().use_md5()
+
+    data = bytes(range(256)) * 1000
+    path = tmp_path / "data.bin"
+    path.write_bytes(data)
+
+    for algo in [HashAlgoEnum.xxh64, HashAlgoEnum.xxh3_64, HashAlgoEnum.xxh3_128]:
+        expected = getattr(xxhash, algo.value)(data).hexdigest()
+        assert hashes.of_bytes(data, algo=algo) == expected
+        assert hashes.of_file(path, algo=algo) == expected
+        assert hashes.of_file(path, algo=algo, use_mmap=True) == expected
+        assert hashes.of_folder(tmp_path, algo=algo) == hashes.of_str(
+            expected, algo=algo
+        )
+
+
+def test_hash_file_mmap_and_buffer(tmp_path, monkeypatch):
+    hashes.use_sha256().use_hexdigesst()
+
+    path = tmp_path / "data.bin"
+    data = bytes(range(256)) * 1000
+    path.write_bytes(data)
+
+    expected = hashes.of_bytes(data)
+    assert hashes.of_file(path, use_mmap=True) == expected
+    assert hashes.of_file(path, use_mmap=False) == expected
+    assert hashes.of_file(path, use_mmap=False, chunk_size=1000) == expected
+    # use_mmap=None uses mmap for file larger than MMAP_THRESHOLD
+    monkeypatch.setattr(fixa.hashes, "MMAP_THRESHOLD", 1000)
+    assert hashes.of_file(path, use_mmap=None) == expected
+    assert hashes.of_file(path, nbytes=100, use_mmap=None) == hashes.of_bytes(
+        data[:100]
+    )
+    monkeypatch.undo()
+
+    # the file is read by chunks of chunk_size
+    class Recorder:
+        def __init__(self):
+            self.sizes = list()
+
+        def update(self, data):
+            self.sizes.append(len(data))
+
+    recorder = Recorder()
+    fixa.hashes._update_from_file(recorder, path, chunk_size=1000)
+    assert max(recorder.sizes) == 1000
+    assert sum(recorder.sizes) == len(data)
+
+    expected = hashes.of_bytes(data[:1234])
+    assert hashes.of_file(path, nbytes=1234, use_mmap=True) == expected
+    assert hashes.of_file(path, nbytes=1234, use_mmap=False) == expected
+    assert hashes.of_file(path, nbytes=1234, chunk_size=100) == expected
+
+    # file object without readinto
+    class Reader:
+        def __init__(self, b):
+            self.b = io.BytesIO(b)
+
+        def read(self, size=-1):
+            return self.b.read(size)
+
+    assert hashes.of_file_object(Reader(data), nbytes=1234, chunk_size=100) == expected
+    assert hashes.of_file_object(Reader(data)) == hashes.of_bytes(data)
+
+    # empty file
+    path = tmp_path / "empty.bin"
+    path.write_bytes(b"")
+    expected = hashes.of_bytes(b"")
+    assert hashes.of_file(path, use_mmap=True) == expected
+    assert hashes.of_file(path, use_mmap=False) == expected
+
+
+def test_hash_file_multi(tmp_path):
+    hashes.use_sha256().use_hexdigesst()
+
+    path = tmp_path / "data.bin"
+    data = bytes(range(256)) * 1000
+    path.write_bytes(data)
+
+    for use_mmap in [True, False]:
+        res = hashes.of_file_multi(
+            path,
+            algos=[HashAlgoEnum.md5, HashAlgoEnum.sha256],
+            use_mmap=use_mmap,
+            s3_etag=S3ETag(part_size=100_000, multipart_threshold=100_000),
+        )
+        assert res == {
+            "md5": hashlib.md5(data).hexdigest(),
+            "sha256": hashlib.sha256(data).hexdigest(),
+            "s3_etag": hashes.of_s3_etag(path, 100_000, 100_000),
+        }
+
+    res = hashes.of_file_multi(
+        path, algos=["sha1"], nbytes=1000, chunk_size=7, hexdigest=False
+    )
+    assert res == {"sha1": hashlib.sha1(data[:1000]).digest()}
+
+    with pytest.raises(ValueError):
+        hashes.of_file_multi(path, algos=["md5"], nbytes=-1)
+    with pytest.raises(ValueError):
+        hashes.of_file_multi(path, algos=["md5"], chunk_size=0)
+
+
+def test_s3_etag(tmp_path):
+    def expected_etag(data: bytes, part_size: int) -> str:
+        parts = [
+            hashlib.md5(data[i : i + part_size]).digest()
+            for i in range(0, len(data), part_size)
+        ]
+        return f"{hashlib.md5(b''.join(parts)).hexdigest()}-{len(parts)}"
+
+    data = bytes(range(256)) * 1000  # 256000 bytes
+
+    # multipart upload
+    m = S3ETag(part_size=100_000, multipart_threshold=100_000)
+    for i in range(0, len(data), 3333):
+        m.update(data[i : i + 3333])
+    assert m.hexdigest() == expected_etag(data, 100_000)
+    assert m.hexdigest().endswith("-3")
+
+    # the last part is a full part
+    m = S3ETag(part_size=128_000, multipart_threshold=100_000)
+    m.update(data)
+    assert m.hexdigest() == expected_etag(data, 128_000)
+    assert m.hexdigest().endswith("-2")
+
+    # single part upload
+    m = S3ETag(part_size=100_000, multipart_threshold=300_000)
+    m.update(data)
+    assert m.hexdigest() == hashlib.md5(data).hexdigest()
+
+    m = S3ETag()
+    m.update(data)
+    assert m.hexdigest() == hashlib.md5(data).hexdigest()
+
+    m = S3ETag()
+    assert m.hexdigest() == hashlib.md5(b"").hexdigest()
+
+    path = tmp_path / "data.bin"
+    path.write_bytes(data)
+    assert hashes.of_s3_etag(path, part_size=100_000, multipart_threshold=0) == (
+        expected_etag(data, 100_000)
+    )
+
+    with pytest.raises(ValueError):
+        S3ETag(part_size=0)
+
+
+def test_hash_stream():
+    hashes.use_sha256().use_hexdigesst()
+
+    data = b"line 1\nline 2\nline 3\n" * 1000
+    expected = hashes.of_bytes(data)
+
+    assert hashes.of_iterable([data[:10], bytearray(data[10:20]), data[20:]]) == (
+        expected
+    )
+    assert hashes.of_iterable(iter([]), hexdigest=False) == hashes.of_bytes(
+        b"", hexdigest=False
+    )
+
+    # reader
+    reader = hashes.reader(io.BytesIO(data))
+    chunks = [reader.read(7), reader.read(1000)]
+    buffer = bytearray(5000)
+    n = reader.readinto(buffer)
+    chunks.append(bytes(buffer[:n]))
+    chunks.append(reader.readline())
+    chunks.extend(reader)
+    chunks.append(reader.read())
+    assert b"".join(chunks) == data
+    assert reader.hexdigest() == expected
+    assert reader.digest() == bytes.fromhex(expected)
+
+    class Reader:  # without readinto
+        def __init__(self, b):
+            self.b = io.BytesIO(b)
+
+        def read(self, size=-1):
+            return self.b.read(size)
+
+    with hashes.reader(Reader(data), algo=HashAlgoEnum.md5) as reader:
+        assert reader.read() == data
+        assert reader.hexdigest() == hashlib.md5(data).hexdigest()
+
+    # reader works with io.BufferedReader
+    reader = hashes.reader(io.BytesIO(data))
+    assert io.BufferedReader(reader).read() == data
+    assert reader.hexdigest() == expected
+
+    # writer
+    f = io.BytesIO()
+    with hashes.writer(f) as writer:
+        writer.write(data[:100])
+        writer.write(memoryview(data)[100:])
+        writer.flush()
+        assert writer.hexdigest() == expected
+        assert writer.digest() == bytes.fromhex(expected)
+    assert f.getvalue() == data
+    assert f.closed is False
+
+    # the wrapped file is closed before the writer
+    f = io.BytesIO()
+    writer = hashes.writer(f)
+    writer.write(data)
+    f.close()
+    writer.flush()
+    writer.close()
+    assert writer.closed is True
+    assert writer.hexdigest() == expected
+
+
+def test_hash_cache(tmp_path):
+    hashes.use_sha256().use_hexdigesst()
+
+    dir_data = tmp_path / "data"
+    dir_data.mkdir()
+    path_a = dir_data / "a.txt"
+    path_b = dir_data / "b.txt"
+    path_a.write_bytes(b"a")
+    path_b.write_bytes(b"b")
+    for p in [path_a, path_b]:
+        os.utime(p, (1_000_000_000, 1_000_000_000))
+    path_db = tmp_path / "cache.sqlite"
+
+    expected = hashes.of_folder(dir_data)
+    with HashCache(path_db) as cache:
+        assert hashes.of_folder(dir_data, cache=cache) == expected
+        assert len(cache) == 2
+        assert hashes.of_file(path_a, cache=cache) == hashes.of_bytes(b"a")
+        assert hashes.of_file(path_a, cache=cache, hexdigest=False) == hashes.of_bytes(
+            b"a", hexdigest=False
+        )
+        assert hashes.of_paths([dir_data], cache=cache, max_workers=2) == (
+            hashes.of_paths([dir_data])
+        )
+        hashes.of_folder(dir_data, algo=HashAlgoEnum.md5, cache=cache)
+        assert len(cache) == 4
+
+    # the cache is persisted, a stale cache value is returned if the
+    # content is changed without changing size, mtime and inode
+    with path_a.open("r+b") as f:
+        f.write(b"x")
+    os.utime(path_a, (1_000_000_000, 1_000_000_000))
+    with HashCache(path_db) as cache:
+        assert hashes.of_file(path_a, cache=cache) == hashes.of_bytes(b"a")
+
+    # verify mode detects it and fixes the cache
+    with HashCache(path_db, verify=True) as cache:
+        assert hashes.of_file(path_a, cache=cache) == hashes.of_bytes(b"x")
+        assert cache.mismatched == [str(path_a.absolute())]
+    with HashCache(path_db) as cache:
+        assert hashes.of_file(path_a, cache=cache) == hashes.of_bytes(b"x")
+
+    # changed mtime invalidates the cache, recently modified file is not cached
+    path_a.write_bytes(b"y")
+    with HashCache(path_db) as cache:
+        assert hashes.of_file(path_a, cache=cache) == hashes.of_bytes(b"y")
+        assert len(cache) == 3
+        path_b.unlink()
+        assert cache.prune() == 1
+        assert len(cache) == 1
+        cache.clear()
+
+
+def test_hash_folder_merkle(tmp_path):
+    hashes.use_sha256().use_hexdigesst()
+
+    root = tmp_path / "root"
+    (root / "a" / "b").mkdir(parents=True)
+    (root / "c").mkdir()
+    (root / "a" / "b" / "1.txt").write_text("1")
+    (root / "a" / "2.txt").write_text("2")
+    (root / "c" / "3.txt").write_text("3")
+    (root / "4.txt").write_text("4")
+
+    tree = hashes.of_folder_merkle(root)
+    assert tree.root_hash == hashes.of_folder_merkle(root, max_workers=4).root_hash
+    assert set(tree.dir_hashes) == {"", "a", "a/b", "c"}
+    assert set(tree.file_hashes) == {"a/b/1.txt", "a/2.txt", "c/3.txt", "4.txt"}
+    assert tree.hash_of(root / "c" / "3.txt") == hashes.of_str("3")
+    assert tree.hash_of("c") != tree.hash_of("a")
+    assert isinstance(tree.root_hash, str)
+
+    def rebuild_and_compare(old, changed):
+        dirs = tree.update(changed)
+        new = hashes.of_folder_merkle(root)
+        assert tree.dir_hashes == new.dir_hashes
+        assert tree.file_hashes == new.file_hashes
+        return dirs, tree.diff(old)
+
+    # modify a file, only the dirty path is re-computed
+    old = hashes.of_folder_merkle(root)
+    (root / "a" / "b" / "1.txt").write_text("one")
+    dirs, diff = rebuild_and_compare(old, [root / "a" / "b" / "1.txt"])
+    assert dirs == ["a/b", "a", ""]
+    assert diff == ["", "a", "a/b", "a/b/1.txt"]
+
+    # add files in new folders
+    old = hashes.of_folder_merkle(root)
+    (root / "d" / "e").mkdir(parents=True)
+    (root / "d" / "e" / "5.txt").write_text("5")
+    dirs, diff = rebuild_and_compare(old, ["d/e/5.txt"])
+    assert dirs == ["d/e", "d", ""]
+    assert diff == ["", "d", "d/e", "d/e/5.txt"]
+
+    # rename a file changes the hash, the content hash of it doesn't
+    old = hashes.of_folder_merkle(root)
+    (root / "4.txt").rename(root / "6.txt")
+    dirs, diff = rebuild_and_compare(old, ["4.txt", "6.txt"])
+    assert dirs == [""]
+    assert diff == ["", "4.txt", "6.txt"]
+
+    # delete a folder
+    old = hashes.of_folder_merkle(root)
+    (root / "d" / "e" / "5.txt").unlink()
+    (root / "d" / "e").rmdir()
+    (root / "d").rmdir()
+    dirs, diff = rebuild_and_compare(old, ["d/e/5.txt"])
+    assert dirs == [""]
+    assert "d" not in tree.dir_hashes
+
+    # add a folder
+    old = hashes.of_folder_merkle(root)
+    (root / "f").mkdir()
+    (root / "f" / "7.txt").write_text("7")
+    dirs, diff = rebuild_and_compare(old, ["f"])
+    assert dirs == ["f", ""]
+
+    # replace a folder with a file
+    old = hashes.of_folder_merkle(root)
+    shutil.rmtree(root / "c")
+    (root / "c").write_text("c")
+    dirs, diff = rebuild_and_compare(old, ["c"])
+    assert dirs == [""]
+
+    # update the root folder
+    old = hashes.of_folder_merkle(root)
+    rebuild_and_compare(old, [root])
+
+    # bytes digest and cache
+    with HashCache(":memory:") as cache:
+        tree = hashes.of_folder_merkle(root, hexdigest=False, cache=cache)
+        assert isinstance(tree.root_hash, bytes)
+        assert tree.root_hash.hex() == hashes.of_folder_merkle(root).root_hash
+
+    with pytest.raises(NotADirectoryError):
+        hashes.of_folder_merkle(root / "c")
+
+
 def test_hash_folder():
     hashes.use_sha256().use_hexdigesst()
 
@@ -72,6 +466,43 @@ def test_hash_folder():
     id6 = hashes.of_paths([dir_fixa, dir_tests, path_readme])
     assert id5 == id6
 
+    # concurrent hashing returns the same result
+    assert hashes.of_folder(dir_fixa, max_workers=4) == id1
+    assert hashes.of_paths([dir_fixa, dir_tests, path_readme], max_workers=4) == id5
+    with pytest.raises(ValueError):
+        hashes.of_folder(dir_fixa, max_workers=0)
+
+
+def test_hash_paths_concurrent(tmp_path):
+    hashes.use_sha256().use_hexdigesst()
+
+    folder = tmp_path / "folder"
+    folder.mkdir()
+    for i in range(3):
+        folder.joinpath(f"{i}.txt").write_text(f"folder file {i}")
+    files = list()
+    for i in range(10):
+        path = tmp_path / f"{i}.txt"
+        path.write_text(f"file {i}")
+        files.append(path)
+    # files in the list and folders are mixed, the order matters
+    paths = files[:5] + [folder] + files[5:]
+
+    expected = hashes.of_str(
+        "".join(
+            [hashes.of_file(p) for p in files[:5]]
+            + [hashes.of_folder(folder)]
+            + [hashes.of_file(p) for p in files[5:]]
+        )
+    )
+    assert hashes.of_paths(paths, max_workers=1) == expected
+    assert hashes.of_paths(paths, max_workers=4) == expected
+    assert hashes.of_paths(paths[::-1], max_workers=4) != expected
+    with HashCache(":memory:") as cache:
+        assert hashes.of_paths(paths, max_workers=4, cache=cache) == expected
+    with pytest.raises(ValueError):
+        hashes.of_paths(files, max_workers=0)
+
 
 def test_hash_anything():
     """
@@ -1,7 +1,10 @@
 # -*- coding: utf-8 -*-
 
 import pytest
+import sys
 import time
+import random
+import array
 from fixa import iterable
 from collections import OrderedDict
 
@@ -50,6 +53,39 @@ def test_flatten_all():
         "z",
         4,
     ]
+    assert list(iterable.flatten_all(nested_iterable, max_depth=1)) == [
+        1,
+        2,
+        "abc",
+        3,
+        ["x", "y", "z"],
+        4,
+    ]
+    assert list(iterable.flatten_all(nested_iterable, max_depth=0)) == nested_iterable
+    with pytest.raises(ValueError):
+        list(iterable.flatten_all(nested_iterable, max_depth=-1))
+
+    assert list(iterable.flatten_all([b"ab", [{"a": 1}]])) == [b"ab", "a"]
+    assert list(iterable.flatten_all([b"ab", [{"a": 1}]], atomic_types=(dict,))) == [
+        97,
+        98,
+        {"a": 1},
+    ]
+    # str is always a leaf, otherwise "a" yields "a" forever
+    assert list(
+        iterable.flatten_all(["ab", ["c", {"a": 1}]], atomic_types=(dict,))
+    ) == [
+        "ab",
+        "c",
+        {"a": 1},
+    ]
+    assert list(iterable.flatten_all(["ab", ["c"]], atomic_types=())) == ["ab", "c"]
+
+    # very deep nesting doesn't hit the recursion limit
+    deep = [0]
+    for i in range(1, 10000):
+        deep = [deep, i]
+    assert list(iterable.flatten_all(deep)) == list(range(10000))
 
 
 def test_nth():
@@ -79,6 +115,89 @@ def test_pull():
 def test_shuffled():
     array = list(range(1000))
     assert iterable.shuffled(range(1000)) != array
+    assert iterable.shuffled(array, seed=1) == iterable.shuffled(array, seed=1)
+
+
+def test_reservoir_sample():
+    for skip_ahead in [True, False]:
+        sample = iterable.reservoir_sample(range(1000), 10, skip_ahead=skip_ahead)
+        assert len(sample) == len(set(sample)) == 10
+        assert iterable.reservoir_sample(
+            iter(range(1000)), 10, seed=1, skip_ahead=skip_ahead
+        ) == iterable.reservoir_sample(range(1000), 10, seed=1, skip_ahead=skip_ahead)
+        assert iterable.reservoir_sample(range(5), 10, skip_ahead=skip_ahead) == [
+            0,
+            1,
+            2,
+            3,
+            4,
+        ]
+        assert iterable.reservoir_sample(range(5), 0, skip_ahead=skip_ahead) == []
+
+        # every item has the same chance to be selected
+        counts = [0] * 10
+        for i in range(2000):
+            for x in iterable.reservoir_sample(
+                range(10), 2, seed=i, skip_ahead=skip_ahead
+            ):
+                counts[x] += 1
+        assert all(300 < c < 500 for c in counts)
+
+    with pytest.raises(ValueError):
+        iterable.reservoir_sample(range(5), -1)
+
+    # Algorithm L with extreme random numbers, w is tiny or close to 1
+    class FixedRandom(random.Random):
+        def __init__(self, value: float):
+            super().__init__(0)
+            self.value = value
+
+        def random(self) -> float:
+            return self.value
+
+    sample = iterable.reservoir_sample(range(100), 1, seed=FixedRandom(5e-324))
+    assert sample == [0]
+    sample = iterable.reservoir_sample(range(100), 1, seed=FixedRandom(1 - 2**-53))
+    assert sample == [99]
+
+
+def test_weighted_reservoir_sample():
+    items = [("a", 1), ("b", 0), ("c", 1000), ("d", 1)]
+    get_weight = lambda x: x[1]
+    counts = {"a": 0, "b": 0, "c": 0, "d": 0}
+    for i in range(200):
+        for x in iterable.weighted_reservoir_sample(items, 2, get_weight, seed=i):
+            counts[x[0]] += 1
+    assert counts["b"] == 0
+    assert counts["c"] == 200
+    assert counts["a"] + counts["d"] == 200
+
+    assert iterable.weighted_reservoir_sample(
+        items, 2, get_weight, seed=1
+    ) == iterable.weighted_reservoir_sample(items, 2, get_weight, seed=1)
+    assert iterable.weighted_reservoir_sample(items, 0, get_weight) == []
+    with pytest.raises(ValueError):
+        iterable.weighted_reservoir_sample(items, -1, get_weight)
+
+
+def test_external_shuffle():
+    data = list(range(100))
+    for max_items_in_memory in [1, 7, 100, 1000]:
+        result = list(
+            iterable.external_shuffle(
+                iter(data), max_items_in_memory=max_items_in_memory, seed=1
+            )
+        )
+        assert sorted(result) == data
+        assert result != data
+        assert result == list(
+            iterable.external_shuffle(
+                data, max_items_in_memory=max_items_in_memory, seed=1
+            )
+        )
+    assert list(iterable.external_shuffle([])) == []
+    with pytest.raises(ValueError):
+        list(iterable.external_shuffle(data, max_items_in_memory=0))
 
 
 def test_grouper():
@@ -112,6 +231,44 @@ def test_grouper_dict():
     ]
 
 
+def test_parallel_map_batches():
+    assert list(iterable.parallel_map_batches(range(10), n=3, func=sum)) == [
+        3,
+        12,
+        21,
+        9,
+    ]
+    assert sorted(
+        iterable.parallel_map_batches(range(10), n=3, func=sum, ordered=False)
+    ) == [3, 9, 12, 21]
+    assert list(
+        iterable.parallel_map_batches(
+            range(10), n=3, func=sum, executor="process", max_workers=2
+        )
+    ) == [3, 12, 21, 9]
+    assert list(
+        iterable.parallel_map_batches({"a": 1, "b": 2, "c": 3}, n=2, func=len)
+    ) == [2, 1]
+
+    # backpressure, only max_in_flight batches are pulled ahead
+    consumed = list()
+
+    def source():
+        for i in range(100):
+            consumed.append(i)
+            yield i
+
+    results = iterable.parallel_map_batches(
+        source(), n=2, func=sum, max_workers=1, max_in_flight=3
+    )
+    assert next(results) == 1
+    assert len(consumed) <= 2 * 4
+    results.close()
+
+    with pytest.raises(ValueError):
+        list(iterable.parallel_map_batches(range(10), n=3, func=sum, max_in_flight=0))
+
+
 def test_group_by():
     class Record:
         def __init__(self, product: str, date: str, sale: int):
@@ -138,6 +295,93 @@ def test_group_by():
     assert sales == [10, 20, 30]
 
 
+def test_group_reduce():
+    records = [("apple", 10), ("apple", 20), ("banana", 30), ("apple", 5)]
+    get_key = lambda x: x[0]
+
+    assert iterable.group_reduce(
+        records, get_key, reducer=lambda acc, x: acc + x[1], initial=0
+    ) == {"apple": 35, "banana": 30}
+    assert iterable.group_reduce(
+        records, get_key, reducer=lambda acc, x: max(acc, x, key=lambda r: r[1])
+    ) == {"apple": ("apple", 20), "banana": ("banana", 30)}
+    # mutable initial value is not shared between keys
+    assert iterable.group_reduce(
+        records, get_key, reducer=lambda acc, x: acc + [x[1]], initial=[]
+    ) == {"apple": [10, 20, 5], "banana": [30]}
+
+    assert iterable.count_by(records, get_key) == {"apple": 3, "banana": 1}
+
+    assert iterable.top_k_by(records, get_key, k=2, sort_key=lambda x: x[1]) == {
+        "apple": [("apple", 20), ("apple", 10)],
+        "banana": [("banana", 30)],
+    }
+    assert iterable.top_k_by(
+        records, get_key, k=2, sort_key=lambda x: x[1], largest=False
+    ) == {
+        "apple": [("apple", 5), ("apple", 10)],
+        "banana": [("banana", 30)],
+    }
+    # ties keep the earlier item
+    assert iterable.top_k_by([1, 1, 1], lambda x: "a", k=1) == {"a": [1]}
+    with pytest.raises(ValueError):
+        iterable.top_k_by(records, get_key, k=0)
+
+
+def test_parallel_group_reduce():
+    import operator
+
+    numbers = list(range(-500, 500))
+    expected = iterable.group_reduce(
+        numbers, get_key=abs, reducer=operator.add, initial=0
+    )
+    for executor in ["thread", "process"]:
+        assert (
+            iterable.parallel_group_reduce(
+                numbers,
+                get_key=abs,
+                reducer=operator.add,
+                combine=operator.add,
+                initial=0,
+                n=77,
+                executor=executor,
+                max_workers=2,
+            )
+            == expected
+        )
+
+
+def test_group_by_sorted():
+    assert list(iterable.group_by_sorted([1, 1, 2, 3, 3], get_key=lambda x: x)) == [
+        (1, [1, 1]),
+        (2, [2]),
+        (3, [3, 3]),
+    ]
+
+
+def test_group_by_external():
+    import random
+
+    rnd = random.Random(0)
+
+    records = [(rnd.randint(1, 20), i) for i in range(1000)]
+    get_key = lambda x: x[0]
+    expected = sorted(iterable.group_by(records, get_key).items())
+    for max_items_in_memory in [1, 7, 1000, 10000]:
+        groups = list(
+            iterable.group_by_external(
+                iter(records),
+                get_key,
+                max_items_in_memory=max_items_in_memory,
+            )
+        )
+        assert groups == expected
+
+    assert list(iterable.group_by_external([], get_key)) == []
+    with pytest.raises(ValueError):
+        list(iterable.group_by_external(records, get_key, max_items_in_memory=0))
+
+
 def test_size_of_generator():
     """测试 :func:`~sfm.iterable.size_of_generator`  的性能。"""
 
@@ -155,6 +399,25 @@ def test_size_of_generator():
 
     assert n1 == n2 == 1000 * 1000
 
+    assert iterable.size_of_generator(iter([])) == 0
+    assert iterable.size_of_generator(range(10)) == 10
+    assert iterable.size_of_generator(iter([1, 2, 3]), use_length_hint=True) == 3
+
+
+def test_size_of_generator_file_object(tmp_path):
+    import io
+
+    path = tmp_path / "lines.txt"
+    for content in ["", "a", "a\n", "a\nb", "a\nb\n", "a\n\nb\n"]:
+        path.write_text(content)
+        with path.open("r") as f:
+            expected = len(list(f))
+        with path.open("r") as f:
+            assert iterable.size_of_generator(f) == expected
+        with path.open("rb") as f:
+            assert iterable.size_of_generator(f) == expected
+    assert iterable.size_of_generator(io.BytesIO(b"a\nb")) == 2
+
 
 def test_running_window():
     assert list(iterable.running_window([1, 2, 3, 4, 5], 3)) == [
@@ -169,6 +432,43 @@ def test_running_window():
         list(iterable.running_window([1, 2, 3], 4))
 
 
+def test_running_window_no_copy():
+    lst = [1, 2, 3, 4, 5]
+    expected = [[1, 2, 3], [2, 3, 4], [3, 4, 5]]
+
+    windows = list(iterable.running_window(lst, 3, copy=False))
+    assert all(isinstance(w, iterable.WindowView) for w in windows)
+    assert windows == expected
+
+    # stream input with copy=True
+    assert list(iterable.running_window(iter(lst), 3)) == expected
+
+    # stream input with copy=False, view is only valid until the next window
+    windows = [w.to_list() for w in iterable.running_window(iter(lst), 3, copy=False)]
+    assert windows == expected
+
+    with pytest.raises(ValueError):
+        list(iterable.running_window(iter([1, 2]), 3))
+    with pytest.raises(ValueError):
+        list(iterable.running_window(iter([1, 2]), 3, copy=False))
+    for copy in [True, False]:
+        with pytest.raises(ValueError):
+            iterable.running_window(iter(lst), 0, copy=copy)
+        with pytest.raises(ValueError):
+            iterable.running_window(lst, 0, copy=copy)
+
+    view = iterable.WindowView(lst, start=3, size=3)
+    assert len(view) == 3
+    assert list(view) == [4, 5, 1]
+    assert view[0] == 4
+    assert view[-1] == 1
+    assert view[1:] == [5, 1]
+    assert view == (4, 5, 1)
+    assert repr(view) == "WindowView([4, 5, 1])"
+    with pytest.raises(IndexError):
+        view[3]
+
+
 def test_cycle_running_window():
     assert list(iterable.cycle_running_window([1, 2, 3, 4, 5], 3)) == [
         [1, 2, 3],
@@ -185,6 +485,54 @@ def test_cycle_running_window():
     with pytest.raises(ValueError):
         list(iterable.cycle_running_window([1, 2, 3], 4))
 
+    assert list(iterable.cycle_running_window([1, 2, 3], 2, copy=False)) == [
+        [1, 2],
+        [2, 3],
+        [3, 1],
+    ]
+
+
+def test_rolling_aggregation():
+    import random
+    import statistics
+
+    rnd = random.Random(0)
+
+    data = [rnd.randint(-100, 100) for _ in range(200)]
+    for size in [1, 2, 5, 17]:
+        for cycle in [False, True]:
+            if cycle:
+                windows = list(iterable.cycle_running_window(data, size))
+            else:
+                windows = list(iterable.running_window(data, size))
+
+            assert list(iterable.rolling_sum(iter(data), size, cycle)) == [
+                sum(w) for w in windows
+            ]
+            assert list(iterable.rolling_mean(data, size, cycle)) == pytest.approx(
+                [sum(w) / size for w in windows]
+            )
+            assert list(iterable.rolling_var(data, size, cycle)) == pytest.approx(
+                [statistics.pvariance(w) for w in windows]
+            )
+            if size > 1:
+                assert list(
+                    iterable.rolling_var(data, size, cycle, ddof=1)
+                ) == pytest.approx([statistics.variance(w) for w in windows])
+            assert list(iterable.rolling_min(data, size, cycle)) == [
+                min(w) for w in windows
+            ]
+            assert list(iterable.rolling_max(data, size, cycle)) == [
+                max(w) for w in windows
+            ]
+
+    with pytest.raises(ValueError):
+        list(iterable.rolling_sum([1, 2], 3))
+    with pytest.raises(ValueError):
+        list(iterable.rolling_max([1, 2], 0))
+    with pytest.raises(ValueError):
+        list(iterable.rolling_var([1, 2], 1, ddof=1))
+
 
 def test_cycle_slice():
     array = [0, 1, 2, 3]
@@ -256,6 +604,96 @@ def test_difference():
         iterable.difference([1, 2, 3], 3)
 
 
+def test_numpy_backend():
+    np = pytest.importorskip("numpy")
+
+    arr = np.array([1, 2, 3, 4, 5])
+    windows = iterable.running_window(arr, 3)
+    assert windows.tolist() == [[1, 2, 3], [2, 3, 4], [3, 4, 5]]
+    assert np.shares_memory(windows, arr)
+    with pytest.raises(ValueError):
+        iterable.running_window(arr, 6)
+
+    assert iterable.cycle_running_window(arr, 3).tolist() == [
+        [1, 2, 3],
+        [2, 3, 4],
+        [3, 4, 5],
+        [4, 5, 1],
+        [5, 1, 2],
+    ]
+
+    arr = np.array([0, 1, 2])
+    for shift in [0, 1, 2, -1, -2]:
+        assert iterable.cyclic_shift(arr, shift).tolist() == iterable.cyclic_shift(
+            [0, 1, 2], shift
+        )
+    for shift in [0, 1, -1, 3, -3]:
+        assert iterable.shift_and_trim(arr, shift).tolist() == iterable.shift_and_trim(
+            [0, 1, 2], shift
+        )
+    for shift in [0, 1, 2, 3, -1, -2, -3]:
+        assert iterable.shift_and_pad(arr, shift).tolist() == iterable.shift_and_pad(
+            [0, 1, 2], shift
+        )
+        assert iterable.shift_and_pad(
+            arr, shift, None
+        ).tolist() == iterable.shift_and_pad([0, 1, 2], shift, None)
+    assert iterable.shift_and_pad(np.array([]), 1).tolist() == []
+
+    arr = np.array([0, 1, 3, 6, 10])
+    for k in [0, 1, 2]:
+        assert iterable.difference(arr, k).tolist() == iterable.difference(
+            [0, 1, 3, 6, 10], k
+        )
+
+    # array.array never uses numpy
+    _test_array_array()
+
+
+def _test_array_array():
+    arr = array.array("d", [1.0, 2.0, 3.0, 4.0])
+    assert list(iterable.running_window(arr, 2)) == [
+        [1.0, 2.0],
+        [2.0, 3.0],
+        [3.0, 4.0],
+    ]
+    assert list(iterable.running_window(arr, 2, copy=False)) == [
+        [1.0, 2.0],
+        [2.0, 3.0],
+        [3.0, 4.0],
+    ]
+    assert list(iterable.cycle_running_window(arr, 3)) == [
+        [1.0, 2.0, 3.0],
+        [2.0, 3.0, 4.0],
+        [3.0, 4.0, 1.0],
+        [4.0, 1.0, 2.0],
+    ]
+    assert iterable.difference(arr, 1) == [1.0, 1.0, 1.0]
+
+    arr = array.array("i", [0, 1, 2])
+    for shift in [0, 1, 2, -1, -2]:
+        res = iterable.cyclic_shift(arr, shift)
+        assert type(res) is array.array
+        assert res.tolist() == iterable.cyclic_shift([0, 1, 2], shift)
+    for shift in [0, 1, -1, 3, -3]:
+        res = iterable.shift_and_trim(arr, shift)
+        assert type(res) is array.array
+        assert res.tolist() == iterable.shift_and_trim([0, 1, 2], shift)
+    for shift in [0, 1, 2, 3, -1, -2, -3]:
+        assert iterable.shift_and_pad(arr, shift) == iterable.shift_and_pad(
+            [0, 1, 2], shift
+        )
+        assert iterable.shift_and_pad(arr, shift, None) == iterable.shift_and_pad(
+            [0, 1, 2], shift, None
+        )
+
+
+def test_array_array_without_numpy(monkeypatch):
+    # the result is the same whether numpy is installed or not
+    monkeypatch.setitem(sys.modules, "numpy", None)
+    _test_array_array()
+
+
 if __name__ == "__main__":
     from fixa.tests import run_cov_test
 
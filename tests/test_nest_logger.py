@@ -1,11 +1,20 @@
 # -*- coding: utf-8 -*-
 
+import typing as T
 import pytest
+import io
+import json
 import time
+import random
+import asyncio
+import logging
+import threading
+import concurrent.futures
 from fixa.nest_logger import (
     format_line,
     format_ruler,
     AlignEnum,
+    OverflowEnum,
     NestedLogger,
 )
 
@@ -15,6 +24,7 @@ logger = NestedLogger(
     # tab="    ",
 )
 
+
 def setup_module(module):
     print("")
 
@@ -194,6 +204,292 @@ def test():
         _test_indent()
 
 
+class ListHandler(logging.Handler):
+    def __init__(self, event: threading.Event = None):
+        super().__init__()
+        self.lines = list()
+        self.event = event
+
+    def emit(self, record):
+        if self.event is not None:
+            self.event.wait()
+        self.lines.append(self.format(record))
+
+
+def new_list_logger(name: str, handler: logging.Handler) -> logging.Logger:
+    _logger = logging.getLogger(name)
+    _logger.handlers.clear()
+    _logger.setLevel(logging.INFO)
+    _logger.propagate = False
+    _logger.addHandler(handler)
+    return _logger
+
+
+def test_lazy_format_and_level():
+    handler = ListHandler()
+    nested_logger = NestedLogger(logger=new_list_logger("lazy_format", handler))
+
+    class Arg:
+        n_str = 0
+
+        def __str__(self):
+            Arg.n_str += 1
+            return "arg"
+
+    # disabled level doesn't format anything
+    assert nested_logger.debug("%s", Arg()) == ""
+    assert Arg.n_str == 0
+    assert handler.lines == []
+
+    assert nested_logger.info("a %s %d", Arg(), 1) == "| a arg 1"
+    assert Arg.n_str == 1
+    assert nested_logger.info("100%") == "| 100%"
+    assert nested_logger.info("%s\n%s", "x", "y") == "| y"
+    assert handler.lines == ["| a arg 1", "| 100%", "| x", "| y"]
+
+    # the cached prefix is reset when the nesting state changes
+    with nested_logger.nested():
+        assert nested_logger.info("a") == "| | a"
+        with nested_logger.indent():
+            assert nested_logger.info("b") == "| |   b"
+            assert nested_logger.info("b", indent=1, tab="-") == "| | --b"
+            assert nested_logger.info("b", pipe="#") == "| #   b"
+        with nested_logger.pipe("#"):
+            assert nested_logger.warning("c") == "| # c"
+        assert nested_logger.error("d") == "| | d"
+    assert nested_logger.critical("e") == "| e"
+
+    # a single dict is the mapping like the standard logging
+    assert nested_logger.info("%(a)s-%(b)s", {"a": 1, "b": 2}) == "| 1-2"
+
+    # wrong format string doesn't raise in the caller
+    stream = io.StringIO()
+    handler = logging.StreamHandler(stream)
+    nested_logger = NestedLogger(logger=new_list_logger("bad_format", handler))
+    raise_exceptions = logging.raiseExceptions
+    logging.raiseExceptions = False  # don't print the traceback of handleError
+    try:
+        assert nested_logger.info("%d %d", 1) == "%d %d"
+        assert nested_logger.info("%d", "x") == "%d"
+    finally:
+        logging.raiseExceptions = raise_exceptions
+    assert stream.getvalue() == ""
+    assert nested_logger.info("%s is 100%% done", "a") == "| a is 100% done"
+
+    # the deprecated positional indent, tab and pipe
+    with pytest.warns(DeprecationWarning):
+        assert nested_logger.info("50% done", 1) == "|   50% done"
+    with pytest.warns(DeprecationWarning):
+        assert nested_logger.info("a", 1, "-", "#") == "# -a"
+    with pytest.warns(DeprecationWarning):
+        assert nested_logger.info("a", 0, None, "#") == "# a"
+
+    nested_logger._logger.setLevel(logging.WARNING)
+    assert nested_logger.ruler("ruler") == ""
+    assert nested_logger.info("info") == ""
+
+
+class RecordHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = list()
+
+    def emit(self, record):  # logging.Handler.handle acquires the lock
+        self.records.append(record.getMessage())
+
+
+def expected_lines(worker_id: int, depth: int, nest: int = 0) -> T.List[str]:
+    """
+    The expected output of a worker that starts at ``nest`` level.
+    """
+    lines = list()
+    for d in range(depth):
+        lines.append("| " * (nest + d + 2) + f"{worker_id} nest {d}")
+        lines.append("| " * (nest + d + 2) + "  " + f"{worker_id} indent {d}")
+    return lines
+
+
+def test_thread_safe():
+    handler = RecordHandler()
+    nested_logger = NestedLogger(logger=new_list_logger("thread_safe", handler))
+    barrier = threading.Barrier(64)
+
+    def run_worker(worker_id: int, depth: int, d: int = 0):
+        if d == 0:
+            barrier.wait()
+        if d == depth:
+            return
+        with nested_logger.nested():
+            nested_logger.info(f"{worker_id} nest {d}")
+            time.sleep(random.random() / 1000)
+            with nested_logger.indent():
+                nested_logger.info(f"{worker_id} indent {d}")
+            run_worker(worker_id, depth, d + 1)
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=64) as pool:
+        futures = [pool.submit(run_worker, i, 1 + i % 5) for i in range(64)]
+        for future in futures:
+            future.result()
+
+    for i in range(64):
+        lines = [line for line in handler.records if line.split()[-3] == str(i)]
+        assert lines == expected_lines(i, 1 + i % 5)
+    assert nested_logger._nest == 0
+    assert nested_logger.info("main") == "| main"
+
+
+def test_asyncio_task_safe():
+    handler = RecordHandler()
+    nested_logger = NestedLogger(logger=new_list_logger("task_safe", handler))
+
+    async def run_task(task_id: int, depth: int, d: int = 0):
+        if d == depth:
+            return
+        with nested_logger.nested():
+            nested_logger.info(f"{task_id} nest {d}")
+            await asyncio.sleep(0)
+            with nested_logger.indent():
+                await asyncio.sleep(0)
+                nested_logger.info(f"{task_id} indent {d}")
+            await run_task(task_id, depth, d + 1)
+
+    async def main():
+        # tasks inherit the nesting state when they are created
+        with nested_logger.nested():
+            await asyncio.gather(*[run_task(i, 1 + i % 5) for i in range(1000)])
+
+    asyncio.run(main())
+
+    by_task = {i: list() for i in range(1000)}
+    for line in handler.records:
+        by_task[int(line.split()[-3])].append(line)
+    for i in range(1000):
+        assert by_task[i] == expected_lines(i, 1 + i % 5, nest=1)
+    assert nested_logger._nest == 0
+
+
+def test_json_mode():
+    handler = RecordHandler()
+    nested_logger = NestedLogger(
+        logger=new_list_logger("json_mode", handler),
+        json_mode=True,
+    )
+
+    @nested_logger.emoji_block(msg="Deploy app {app_name}", emoji="🚀")
+    def deploy_app(app_name: str):
+        nested_logger.info("deploy %s", app_name)
+        run_test()
+
+    @nested_logger.pretty_log()
+    def run_test():
+        nested_logger.info("test")
+        nested_logger.ruler("ruler")
+        with nested_logger.indent():
+            raise ValueError("failed")
+
+    with pytest.raises(ValueError):
+        deploy_app(app_name="my_app")
+    nested_logger.debug("ignored")
+    nested_logger.info("top")
+
+    records = [json.loads(line) for line in handler.records]
+    assert [record["type"] for record in records] == [
+        "log",
+        "log",
+        "log",
+        "span",
+        "span",
+        "log",
+    ]
+    log1, log2, log3, span2, span1, log4 = records
+    assert span1["name"] == "Deploy app my_app"
+    assert span1["parent_id"] is None
+    assert span1["depth"] == 0
+    assert span1["exception"] == "ValueError: failed"
+    assert span2["name"] == "run_test"
+    assert span2["parent_id"] == span1["span_id"]
+    assert span2["depth"] == 1
+    assert span1["start"] <= span2["start"] <= span2["end"] <= span1["end"]
+    assert span2["elapsed"] <= span1["elapsed"]
+
+    assert log1["msg"] == "deploy my_app"
+    assert log1["span_id"] == span1["span_id"]
+    assert log1["depth"] == 1
+    assert log1["level"] == "INFO"
+    assert (log2["msg"], log3["msg"]) == ("test", "ruler")
+    assert log2["span_id"] == log3["span_id"] == span2["span_id"]
+    assert log4["span_id"] is None
+    assert log4["depth"] == 0
+
+    # span context manager, it tracks the span in text mode too
+    nested_logger.json_mode = False
+    with nested_logger.span("text") as span:
+        assert span.depth == 0
+        with nested_logger.span("inner") as inner:
+            assert inner.parent_id == span.span_id
+    nested_logger.json_mode = True
+
+    handler.records.clear()
+    with nested_logger.span("block") as span:
+        nested_logger.info("a")
+    log, record = [json.loads(line) for line in handler.records]
+    assert record["span_id"] == span.span_id == log["span_id"]
+    assert record["exception"] is None
+
+    # span id doesn't depend on the seed of the global random
+    span_ids = set()
+    for _ in range(2):
+        random.seed(1)
+        with nested_logger.span("seed") as span:
+            assert len(span.span_id) == 16
+            span_ids.add(span.span_id)
+    assert len(span_ids) == 2
+
+    # the level of the ruler follows the func
+    handler.records.clear()
+    nested_logger.ruler("warn", func=nested_logger._logger.warning)
+    nested_logger.ruler("info")
+    assert [json.loads(line)["level"] for line in handler.records] == [
+        "WARNING",
+        "INFO",
+    ]
+
+
+def test_async_mode():
+    handler = ListHandler()
+    nested_logger = NestedLogger(logger=new_list_logger("async_block", handler))
+    nested_logger.enable_async(max_queue_size=10)
+    with pytest.raises(RuntimeError):
+        nested_logger.enable_async()
+    with nested_logger.nested():
+        for i in range(100):
+            nested_logger.info(f"line {i}")
+    nested_logger.disable_async()
+    nested_logger.disable_async()  # no effect
+    assert handler.lines == [f"| | line {i}" for i in range(100)]
+    assert nested_logger.dropped == 0
+
+    # back to synchronous mode
+    nested_logger.info("sync")
+    assert handler.lines[-1] == "| sync"
+
+    # drop records when the queue is full
+    event = threading.Event()
+    handler = ListHandler(event=event)
+    nested_logger = NestedLogger(logger=new_list_logger("async_drop", handler))
+    nested_logger.enable_async(max_queue_size=1, overflow=OverflowEnum.drop)
+    for i in range(10):
+        nested_logger.info(f"line {i}")
+    event.set()
+    nested_logger.disable_async()
+    assert nested_logger.dropped >= 8
+    assert len(handler.lines) + nested_logger.dropped == 10
+    assert handler.lines[0] == "| line 0"
+
+    with pytest.raises(ValueError):
+        nested_logger.enable_async(max_queue_size=0)
+
+
 if __name__ == "__main__":
     from fixa.tests import run_cov_test
 